@@ -1,19 +1,22 @@
 import sys
 import os
-from flask import Flask, render_template, request, redirect, url_for, flash, session
+from flask import Flask, render_template, request, redirect, url_for, flash, session, Response, stream_with_context
 from sqlalchemy.orm import sessionmaker
 from functools import wraps
 import datetime
 
 # Add project root to the Python path
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
-from trash_detect.database import engine, User, IssueReport, create_db_and_tables
+from trash_detect.database import engine, User, IssueReport, DisposalRecord, Camera, ensure_db_and_tables
+from trash_detect.bulk_io import import_users, import_disposal_records, export_rows
 
 admin_app = Flask(__name__)
 admin_app.secret_key = 'adminsecretkey' # Replace with a strong secret key in production
 
-# Create database tables if they don't exist
-create_db_and_tables()
+# Create database tables if they don't exist, on the first request rather than at import time
+@admin_app.before_request
+def ensure_tables():
+    ensure_db_and_tables()
 
 # SessionLocal for database interactions
 Session = sessionmaker(bind=engine)
@@ -146,5 +149,89 @@ def admin_resolve_issue(issue_id):
     db_session.close()
     return redirect(url_for('admin_issues'))
 
+# --- Camera Registry ---
+@admin_app.route('/admin/cameras', methods=['GET', 'POST'])
+@admin_login_required
+def admin_cameras():
+    db_session = Session()
+    if request.method == 'POST':
+        location = request.form.get('location', '').strip()
+        stream_url = request.form.get('stream_url', '').strip()
+        if not location or not stream_url:
+            flash('Location and stream URL are required.', 'danger')
+        elif db_session.query(Camera).filter_by(location=location).first():
+            flash(f'Camera {location} is already registered.', 'danger')
+        else:
+            db_session.add(Camera(location=location, stream_url=stream_url))
+            db_session.commit()
+            flash(f'Camera {location} registered.', 'success')
+    cameras = db_session.query(Camera).order_by(Camera.location).all()
+    db_session.close()
+    return render_template('cameras.html', cameras=cameras)
+
+@admin_app.route('/admin/camera/<int:camera_id>/toggle', methods=['POST'])
+@admin_login_required
+def admin_toggle_camera(camera_id):
+    db_session = Session()
+    camera = db_session.query(Camera).filter_by(id=camera_id).first()
+    if camera:
+        camera.is_active = not camera.is_active
+        db_session.commit()
+        flash(f"Camera {camera.location} {'activated' if camera.is_active else 'deactivated'}.", 'success')
+    else:
+        flash('Camera not found.', 'danger')
+    db_session.close()
+    return redirect(url_for('admin_cameras'))
+
+# --- Bulk Import / Export ---
+BULK_KINDS = {
+    'users': (User, import_users),
+    'disposal_records': (DisposalRecord, import_disposal_records),
+}
+
+def _bulk_format(filename):
+    # CSV, or JSON Lines (one object per line) for .json/.jsonl files
+    extension = os.path.splitext(filename)[1].lower()
+    if extension == '.csv':
+        return 'csv'
+    if extension in ('.json', '.jsonl'):
+        return 'json'
+    return None
+
+@admin_app.route('/admin/bulk', methods=['GET', 'POST'])
+@admin_login_required
+def admin_bulk():
+    report = None
+    if request.method == 'POST':
+        kind = request.form.get('kind')
+        upload = request.files.get('file')
+        if kind not in BULK_KINDS:
+            flash('Unknown record type.', 'danger')
+        elif not upload or upload.filename == '':
+            flash('No selected file', 'danger')
+        elif _bulk_format(upload.filename) is None:
+            flash('Only .csv, .json and .jsonl files are supported.', 'danger')
+        else:
+            _, importer = BULK_KINDS[kind]
+            report = importer(upload.stream, fmt=_bulk_format(upload.filename)).to_dict()
+            flash(f"Imported {report['inserted']} rows, skipped {report['duplicates']} duplicates, "
+                  f"{report['error_count']} errors.", 'success' if report['error_count'] == 0 else 'warning')
+    return render_template('bulk.html', report=report)
+
+@admin_app.route('/admin/export/<kind>.<fmt>')
+@admin_login_required
+def admin_export(kind, fmt):
+    if kind not in BULK_KINDS or fmt not in ('csv', 'json'):
+        flash('Unknown export.', 'danger')
+        return redirect(url_for('admin_bulk'))
+    model, _ = BULK_KINDS[kind]
+    extension = 'csv' if fmt == 'csv' else 'jsonl'
+    mimetype = 'text/csv' if fmt == 'csv' else 'application/x-ndjson'
+    return Response(
+        stream_with_context(export_rows(model, fmt)),
+        mimetype=mimetype,
+        headers={'Content-Disposition': f'attachment; filename={kind}.{extension}'}
+    )
+
 if __name__ == '__main__':
     admin_app.run(debug=True, port=5001)
\ No newline at end of file
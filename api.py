@@ -1,8 +1,25 @@
+import io
+import os
+import sys
 from flask import Flask, request, jsonify
-from model.inference import predict
+
+# Add the model directory to the Python path; its modules import each other by file name
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'model'))
+from inference import predict, DEFAULT_MODEL_PATH, startup_timings
+from cache import PredictionCache, model_version
 
 app = Flask(__name__)
 
+# Results for repeated uploads, keyed by image content and model version. Set
+# PREDICTION_CACHE_DIR to also keep them on disk across restarts, and
+# PREDICTION_CACHE_MAX_DISTANCE (e.g. 4) to also reuse results for near-identical
+# images, which can hide small objects entering a static scene.
+max_distance = os.environ.get('PREDICTION_CACHE_MAX_DISTANCE')
+prediction_cache = PredictionCache(
+    disk_dir=os.environ.get('PREDICTION_CACHE_DIR'),
+    max_distance=int(max_distance) if max_distance else None
+)
+
 @app.route('/predict', methods=['POST'])
 def predict_api():
     if 'file' not in request.files:
@@ -11,12 +28,12 @@ def predict_api():
     if file.filename == '':
         return jsonify({'error': 'No selected file'}), 400
     if file:
-        # Save the image to a temporary location
-        image_path = f'temp_{file.filename}'
-        file.save(image_path)
-
-        # Perform prediction
-        predictions = predict(image_path)
+        image_bytes = file.read()
+        predictions, cache_key = prediction_cache.get(image_bytes, model_version(DEFAULT_MODEL_PATH))
+        if predictions is None:
+            # Perform prediction
+            predictions = predict(io.BytesIO(image_bytes))
+            prediction_cache.put(cache_key, predictions)
 
         # Return the predictions as JSON
         return jsonify(predictions)
@@ -25,5 +42,9 @@ def predict_api():
 def health_check():
     return jsonify({'status': 'API is running'})
 
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    return jsonify({'prediction_cache': prediction_cache.stats(), 'startup': startup_timings})
+
 if __name__ == '__main__':
     app.run(debug=True, port=5002)
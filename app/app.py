@@ -7,13 +7,16 @@ import datetime
 
 # Add project root to the Python path
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
-from trash_detect.database import engine, User, IssueReport, DisposalRecord, create_db_and_tables
+from trash_detect.database import engine, User, IssueReport, DisposalRecord, Camera, ensure_db_and_tables
+from trash_detect.archive import user_disposal_history
 
 app = Flask(__name__)
 app.secret_key = 'supersecretkey' # Replace with a strong secret key in production
 
-# Create database tables if they don't exist
-create_db_and_tables()
+# Create database tables if they don't exist, on the first request rather than at import time
+@app.before_request
+def ensure_tables():
+    ensure_db_and_tables()
 
 # SessionLocal for database interactions
 Session = sessionmaker(bind=engine)
@@ -94,7 +97,7 @@ def register():
 def dashboard():
     db_session = Session()
     user = db_session.query(User).filter_by(id=session['user_id']).first()
-    disposal_footages = db_session.query(DisposalRecord).filter_by(user_id=session['user_id']).order_by(DisposalRecord.timestamp.desc()).limit(5).all()
+    disposal_footages = user_disposal_history(db_session, session['user_id'], limit=5)
     db_session.close()
 
     if not user:
@@ -193,13 +196,22 @@ def upload_footage():
 
         db_session = Session()
         try:
+            # The location comes from the form, so once cameras are registered (/admin/cameras)
+            # only registered, active ones are accepted. Without a registry any location is recorded.
+            cctv_location = request.form.get('cctv_location', 'CCTV_1')
+            if db_session.query(Camera).first() and not db_session.query(Camera).filter_by(
+                location=cctv_location, is_active=True
+            ).first():
+                flash('Unknown CCTV location.', 'danger')
+                return redirect(url_for('dashboard'))
+
             user = db_session.query(User).filter_by(id=session['user_id']).first()
             user.points += points_to_award
 
             # Create a new disposal record
             new_disposal_record = DisposalRecord(
                 user_id=session['user_id'],
-                cctv_location='CCTV_1', # Placeholder
+                cctv_location=cctv_location,
                 trash_type='plastic', # Placeholder
                 disposed_properly=True if dummy_prediction['disposal_class'] == 1 else False,
                 points_awarded=points_to_award,
@@ -0,0 +1,281 @@
+import os
+import uuid
+import argparse
+import datetime
+from collections import defaultdict
+
+from sqlalchemy import select, delete, text
+
+from .database import engine, DisposalRecord, ArchivedUserMonth, ensure_db_and_tables
+
+# --- Disposal Record Archive ---
+# disposal_records gains a row per event for every camera, forever, in the same
+# SQLite table that serves the dashboards. Records older than a cutoff are
+# periodically moved into zstd-compressed Parquet files, partitioned by month
+# and cctv_location (hive layout: month=2025-01/cctv_location=CCTV_1/...), and
+# deleted from the live table. Analytics read the archive with column and
+# partition pruning. Rows are sorted by user inside each file, so row group
+# statistics let per-user reads skip most of a file, and the archived_user_months
+# table records which months hold a user's records. user_disposal_history()
+# reads both tiers so per-user history keeps working. After each run the
+# partitions it touched are compacted back into one file each.
+#
+# Run periodically (e.g. from cron), from the directory containing trash_detect:
+#   python -m trash_detect.archive --older-than-days 90
+
+ARCHIVE_DIR = os.environ.get('ARCHIVE_DIR', os.path.join('archive', 'disposal_records'))
+DEFAULT_CHUNK_SIZE = 50000
+ROWS_PER_GROUP = 10000 # Smaller row groups prune per-user reads more finely
+SORT_KEYS = [('user_id', 'ascending'), ('timestamp', 'ascending')]
+READ_ATTEMPTS = 3 # Reads are retried when compaction removes a file after it was listed
+COLUMNS = ['id', 'user_id', 'cctv_location', 'timestamp', 'trash_type', 'disposed_properly',
+           'points_awarded', 'footage_url']
+
+def _pyarrow():
+    # pyarrow is only needed once something is archived; the apps run without it
+    try:
+        import pyarrow
+        import pyarrow.dataset
+    except ImportError:
+        raise RuntimeError("The disposal record archive requires pyarrow (pip install pyarrow)")
+    return pyarrow
+
+def _schema(pa):
+    return pa.schema([
+        ('id', pa.int64()),
+        ('user_id', pa.int64()),
+        ('cctv_location', pa.string()),
+        ('timestamp', pa.timestamp('us')),
+        ('trash_type', pa.string()),
+        ('disposed_properly', pa.bool_()),
+        ('points_awarded', pa.int64()),
+        ('footage_url', pa.string()),
+        ('month', pa.string()),
+    ])
+
+def _partitioning(pa):
+    return pa.dataset.partitioning(
+        pa.schema([('month', pa.string()), ('cctv_location', pa.string())]), flavor='hive'
+    )
+
+def _write_chunk(pa, rows, archive_dir):
+    """
+    Writes (id, user_id, ...) tuples in COLUMNS order into new files under
+    archive_dir and returns them as a pyarrow Table.
+    """
+    data = {name: [row[i] for row in rows] for i, name in enumerate(COLUMNS)}
+    data['month'] = [timestamp.strftime('%Y-%m') for timestamp in data['timestamp']]
+    table = pa.Table.from_pydict(data, schema=_schema(pa)).sort_by(SORT_KEYS)
+    # pyarrow refuses more than 1024 partitions per write by default; hundreds of
+    # cameras over a couple of years exceed that within one chunk
+    partitions = len(set(zip(data['month'], data['cctv_location'])))
+    pa.dataset.write_dataset(
+        table,
+        archive_dir,
+        format='parquet',
+        partitioning=_partitioning(pa),
+        basename_template=f'part-{uuid.uuid4().hex}-{{i}}.parquet',
+        existing_data_behavior='overwrite_or_ignore',
+        file_options=pa.dataset.ParquetFileFormat().make_write_options(compression='zstd'),
+        preserve_order=True,
+        max_rows_per_group=ROWS_PER_GROUP,
+        max_partitions=max(partitions, 1),
+    )
+    return table
+
+def _index_user_months(conn, table):
+    # Adds the chunk's (user_id, month) pairs that archived_user_months does not have yet
+    index = ArchivedUserMonth.__table__
+    pairs = {
+        (user_id, month) for user_id, month in zip(table.column('user_id').to_pylist(), table.column('month').to_pylist())
+        if user_id is not None
+    }
+    months = list({month for _, month in pairs})
+    existing = set(conn.execute(select(index.c.user_id, index.c.month).where(index.c.month.in_(months))).all())
+    new = [{'user_id': user_id, 'month': month} for user_id, month in pairs - existing]
+    if new:
+        conn.execute(index.insert(), new)
+
+def _first_per_id(pa, table):
+    # Keeps the first row for each record id
+    import pyarrow.compute as pc
+    if table.num_rows == 0:
+        return table
+    table = table.append_column('_row', pa.array(range(table.num_rows), pa.int64()))
+    first = table.group_by('id').aggregate([('_row', 'min')])['_row_min']
+    return table.take(pc.take(first, pc.sort_indices(first))).drop_columns(['_row'])
+
+def archive_disposal_records(cutoff, archive_dir=ARCHIVE_DIR, chunk_size=DEFAULT_CHUNK_SIZE, vacuum=False):
+    """
+    Moves disposal records with a timestamp before cutoff from the live table
+    into the archive, chunk by chunk. Returns the number of records moved.
+
+    Files are written before the rows are deleted, so a crash in between leaves
+    a record in both tiers rather than in neither; readers drop such
+    duplicates by id.
+    """
+    pa = _pyarrow()
+    ensure_db_and_tables()
+    table = DisposalRecord.__table__
+    columns = [table.c[name] for name in COLUMNS]
+    partitions = set()
+    moved = 0
+    while True:
+        with engine.connect() as conn:
+            rows = conn.execute(
+                select(*columns).where(table.c.timestamp < cutoff).order_by(table.c.id).limit(chunk_size)
+            ).all()
+        if not rows:
+            break
+
+        written = _write_chunk(pa, rows, archive_dir)
+        partitions.update(zip(written.column('month').to_pylist(), written.column('cctv_location').to_pylist()))
+
+        # The chunk is exactly the old rows up to its last id
+        with engine.begin() as conn:
+            _index_user_months(conn, written)
+            conn.execute(delete(table).where(table.c.timestamp < cutoff).where(table.c.id <= rows[-1][0]))
+        moved += len(rows)
+
+    # Every chunk added files to its partitions; merge them
+    compact_archive(archive_dir, partitions)
+
+    if vacuum and moved:
+        # SQLite only returns freed pages to the file system on VACUUM
+        with engine.connect() as conn:
+            conn.execution_options(isolation_level='AUTOCOMMIT').execute(text('VACUUM'))
+    return moved
+
+def compact_archive(archive_dir=ARCHIVE_DIR, partitions=None):
+    """
+    Rewrites each partition that holds more than one file as a single file,
+    with duplicate records dropped and rows sorted by user. partitions limits
+    this to the given (month, cctv_location) pairs. Returns the number of
+    partitions rewritten.
+
+    The new file is in place before the old ones are removed, so a crash
+    leaves duplicates, which readers drop, rather than lost records, and a
+    reader that listed a removed file lists the partition again.
+    """
+    if not os.path.isdir(archive_dir):
+        return 0
+    pa = _pyarrow()
+    import pyarrow.parquet as pq
+    ds = pa.dataset
+    files = defaultdict(list)
+    for fragment in ds.dataset(archive_dir, format='parquet', partitioning=_partitioning(pa)).get_fragments():
+        keys = ds.get_partition_keys(fragment.partition_expression)
+        files[(keys['month'], keys['cctv_location'])].append(fragment.path)
+
+    compacted = 0
+    for partition, paths in files.items():
+        if len(paths) < 2 or (partitions is not None and partition not in partitions):
+            continue
+        merged = _first_per_id(pa, ds.dataset(paths, format='parquet').to_table()).sort_by(SORT_KEYS)
+        directory = os.path.dirname(paths[0])
+        name = f'part-{uuid.uuid4().hex}-0.parquet'
+        # The leading underscore hides the file from readers until it is complete
+        pq.write_table(merged, os.path.join(directory, f'_{name}'), compression='zstd', row_group_size=ROWS_PER_GROUP)
+        os.replace(os.path.join(directory, f'_{name}'), os.path.join(directory, name))
+        for path in paths:
+            os.remove(path)
+        compacted += 1
+    return compacted
+
+def _month_files(archive_dir, months):
+    # Lists only the given month partitions instead of the whole archive tree
+    files = []
+    for month in months:
+        for root, _, names in os.walk(os.path.join(archive_dir, f'month={month}')):
+            files.extend(os.path.join(root, name) for name in names
+                         if name.endswith('.parquet') and not name.startswith(('_', '.')))
+    return files
+
+def query_archive(columns=None, user_id=None, start=None, end=None, cctv_locations=None, months=None,
+                  archive_dir=ARCHIVE_DIR):
+    """
+    Reads archived records as a pyarrow Table. Only the requested columns (plus
+    id) are read, and month/cctv_location filters skip whole partitions. A
+    record archived twice is returned once. Given months, only those month
+    directories are listed. Returns None if nothing has been archived yet.
+    """
+    if not os.path.isdir(archive_dir):
+        return None
+    pa = _pyarrow()
+    ds = pa.dataset
+
+    conditions = []
+    if user_id is not None:
+        conditions.append(ds.field('user_id') == user_id)
+    if start is not None:
+        conditions.append(ds.field('month') >= start.strftime('%Y-%m'))
+        conditions.append(ds.field('timestamp') >= pa.scalar(start, pa.timestamp('us')))
+    if end is not None:
+        conditions.append(ds.field('month') <= end.strftime('%Y-%m'))
+        conditions.append(ds.field('timestamp') < pa.scalar(end, pa.timestamp('us')))
+    if cctv_locations is not None:
+        conditions.append(ds.field('cctv_location').isin(list(cctv_locations)))
+    if months is not None:
+        conditions.append(ds.field('month').isin(list(months)))
+
+    condition = None
+    for expression in conditions:
+        condition = expression if condition is None else condition & expression
+    # id is always read, so that records written twice can be dropped
+    read_columns = None if columns is None else ['id'] + [name for name in columns if name != 'id']
+    for attempt in range(READ_ATTEMPTS):
+        try:
+            if months is None:
+                dataset = ds.dataset(archive_dir, format='parquet', partitioning=_partitioning(pa))
+            else:
+                dataset = ds.dataset(_month_files(archive_dir, months), format='parquet', schema=_schema(pa),
+                                     partitioning=_partitioning(pa), partition_base_dir=archive_dir)
+            archived = dataset.to_table(columns=read_columns, filter=condition)
+            break
+        except FileNotFoundError:
+            # compact_archive swapped a partition's files after they were listed; its
+            # replacement is already in place, so listing again finds the records
+            if attempt == READ_ATTEMPTS - 1:
+                raise
+    archived = _first_per_id(pa, archived)
+    return archived if columns is None else archived.select(list(columns))
+
+def user_disposal_history(db_session, user_id, limit=None, archive_dir=ARCHIVE_DIR):
+    """
+    A user's disposal records, newest first, across the live table and the
+    archive. The archive is only read when the live table cannot fill the
+    limit, and then only the months that hold the user's records, newest
+    first, until the limit is filled. Archived rows are returned as detached
+    DisposalRecord instances so callers can treat both tiers the same way.
+    """
+    query = db_session.query(DisposalRecord).filter_by(user_id=user_id).order_by(DisposalRecord.timestamp.desc())
+    records = query.limit(limit).all() if limit else query.all()
+    if limit and len(records) >= limit:
+        return records
+
+    months = db_session.query(ArchivedUserMonth.month).filter_by(user_id=user_id).order_by(ArchivedUserMonth.month.desc())
+    seen = {record.id for record in records}
+    for (month,) in months.all():
+        archived = query_archive(columns=COLUMNS, user_id=user_id, months=[month], archive_dir=archive_dir)
+        if archived is None:
+            break
+        for row in archived.to_pylist():
+            if row['id'] not in seen:
+                seen.add(row['id'])
+                records.append(DisposalRecord(**row))
+        # Older months cannot displace what has been collected once the limit is filled
+        if limit and len(records) >= limit:
+            break
+    records.sort(key=lambda record: record.timestamp, reverse=True)
+    return records[:limit] if limit else records
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Move old disposal records into the columnar archive')
+    parser.add_argument('--older-than-days', type=int, default=90)
+    parser.add_argument('--archive-dir', default=ARCHIVE_DIR)
+    parser.add_argument('--vacuum', action='store_true', help='Shrink the SQLite file afterwards')
+    args = parser.parse_args()
+
+    cutoff = datetime.datetime.now() - datetime.timedelta(days=args.older_than_days)
+    moved = archive_disposal_records(cutoff, args.archive_dir, vacuum=args.vacuum)
+    print(f"Archived {moved} disposal records older than {cutoff:%Y-%m-%d}.")
@@ -0,0 +1,310 @@
+import os
+import sys
+import io
+import json
+import time
+import random
+import shutil
+import argparse
+import platform
+import resource
+import tempfile
+import statistics
+import subprocess
+import threading
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+# --- Benchmark Suite ---
+# Measures inference and training performance on synthetic images and a
+# randomly initialised checkpoint, so runs are reproducible on any machine
+# without datasets or downloaded weights. Results are written as JSON and can be
+# compared against a stored baseline to flag regressions.
+#
+# Usage:
+#   python benchmarks/run_benchmarks.py --output results.json
+#   python benchmarks/run_benchmarks.py --baseline benchmarks/baseline.json
+#   python benchmarks/run_benchmarks.py --save-baseline benchmarks/baseline.json
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+MODEL_DIR = os.path.join(ROOT_DIR, 'model')
+sys.path.insert(0, ROOT_DIR)
+sys.path.insert(0, MODEL_DIR)
+
+import torch
+from torch.utils.data import DataLoader
+from PIL import Image
+
+from model import TrashDetectionModel
+from dataset import TrashDetectionDataset
+from preprocess import data_transform, INPUT_SIZE
+from inference import load_model, predict_image
+
+NUM_TRASH_CLASSES = 60
+SEED = 0
+
+# --- Synthetic Data ---
+
+def make_image(rng, size=(640, 480)):
+    image = Image.frombytes('RGB', size, rng.randbytes(size[0] * size[1] * 3))
+    buffer = io.BytesIO()
+    image.save(buffer, format='JPEG', quality=90)
+    return buffer.getvalue()
+
+def make_checkpoint(path):
+    torch.manual_seed(SEED)
+    model = TrashDetectionModel(num_trash_classes=NUM_TRASH_CLASSES, pretrained=False)
+    torch.save(model.state_dict(), path)
+
+def make_image_dir(path, count, rng):
+    os.makedirs(path, exist_ok=True)
+    for i in range(count):
+        with open(os.path.join(path, f'synthetic_{i:05d}.jpg'), 'wb') as f:
+            f.write(make_image(rng))
+
+# --- Benchmarks ---
+
+def metric(value, unit, higher_is_better):
+    return {'value': value, 'unit': unit, 'higher_is_better': higher_is_better}
+
+def bench_cold_start(workdir):
+    # Fresh interpreter: import torch, import the inference module, load the checkpoint
+    script = (
+        "import sys, time, json\n"
+        "start = time.perf_counter()\n"
+        "import torch\n"
+        "torch_imported = time.perf_counter()\n"
+        f"sys.path.insert(0, {MODEL_DIR!r})\n"
+        "import inference\n"
+        "module_imported = time.perf_counter()\n"
+        f"inference.load_model('trash_detection_model.pth', {NUM_TRASH_CLASSES})\n"
+        "loaded = time.perf_counter()\n"
+        "print(json.dumps([torch_imported - start, module_imported - torch_imported, loaded - module_imported,\n"
+        "                  inference.startup_timings]))\n"
+    )
+    output = subprocess.run([sys.executable, '-c', script], cwd=workdir, capture_output=True, text=True, check=True)
+    torch_import, module_import, model_load, steps = json.loads(output.stdout.strip().splitlines()[-1])
+    return {
+        'cold_start_construct_model_s': metric(steps.get('construct_model_s', 0.0), 's', False),
+        'cold_start_load_checkpoint_s': metric(steps.get('load_checkpoint_s', 0.0), 's', False),
+        'cold_start_torch_import_s': metric(torch_import, 's', False),
+        'cold_start_module_import_s': metric(module_import, 's', False),
+        'cold_start_model_load_s': metric(model_load, 's', False),
+        'cold_start_excluding_torch_s': metric(module_import + model_load, 's', False),
+        'cold_start_peak_rss_mb': metric(resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024, 'MB', False),
+    }
+
+def bench_single_image(model, images, repeats):
+    for image in images[:3]: # Warm-up
+        predict_image(model, Image.open(io.BytesIO(image)))
+    timings = []
+    for i in range(repeats):
+        image = Image.open(io.BytesIO(images[i % len(images)]))
+        start = time.perf_counter()
+        predict_image(model, image)
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    return {
+        'single_image_p50_ms': metric(statistics.median(timings), 'ms', False),
+        'single_image_p95_ms': metric(timings[int(0.95 * (len(timings) - 1))], 'ms', False),
+    }
+
+def bench_batched_throughput(model, batch_sizes, seconds):
+    results = {}
+    for batch_size in batch_sizes:
+        batch = torch.randn(batch_size, 3, INPUT_SIZE, INPUT_SIZE)
+        with torch.no_grad():
+            model(batch) # Warm-up
+            samples = 0
+            start = time.perf_counter()
+            while time.perf_counter() - start < seconds:
+                model(batch)
+                samples += batch_size
+        results[f'batched_throughput_bs{batch_size}_ips'] = metric(samples / (time.perf_counter() - start), 'images/s', True)
+    return results
+
+def bench_train_step(batch_size, steps):
+    torch.manual_seed(SEED)
+    model = TrashDetectionModel(num_trash_classes=NUM_TRASH_CLASSES, pretrained=False)
+    model.train()
+    optimizer = torch.optim.Adam(model.parameters(), lr=0.001)
+    criterion_bbox = torch.nn.SmoothL1Loss()
+    criterion_class = torch.nn.CrossEntropyLoss()
+    images = torch.randn(batch_size, 3, INPUT_SIZE, INPUT_SIZE)
+    targets = {
+        'person_bbox': torch.rand(batch_size, 4),
+        'person_class': torch.randint(0, 2, (batch_size,)),
+        'trash_class': torch.randint(0, NUM_TRASH_CLASSES, (batch_size,)),
+        'disposal_class': torch.randint(0, 2, (batch_size,)),
+    }
+
+    def step():
+        person_bbox, person_logits, face_embedding, trash_logits, disposal_logits = model(images)
+        loss = criterion_class(person_logits, targets['person_class']) + \
+               criterion_class(trash_logits, targets['trash_class']) + \
+               criterion_class(disposal_logits, targets['disposal_class']) + \
+               criterion_bbox(person_bbox, targets['person_bbox'])
+        optimizer.zero_grad()
+        loss.backward()
+        optimizer.step()
+
+    step() # Warm-up
+    start = time.perf_counter()
+    for _ in range(steps):
+        step()
+    return {'train_step_sps': metric(batch_size * steps / (time.perf_counter() - start), 'samples/s', True)}
+
+def bench_dataloader(image_dir, batch_size, num_workers_options):
+    results = {}
+    dataset = TrashDetectionDataset(image_dir, transform=data_transform)
+    for num_workers in num_workers_options:
+        loader = DataLoader(dataset, batch_size=batch_size, shuffle=False, num_workers=num_workers)
+        start = time.perf_counter()
+        samples = sum(images.shape[0] for images, _ in loader)
+        results[f'dataloader_w{num_workers}_sps'] = metric(samples / (time.perf_counter() - start), 'samples/s', True)
+    return results
+
+def _post_image(url, image):
+    boundary = 'benchmark-boundary'
+    body = (
+        f'--{boundary}\r\nContent-Disposition: form-data; name="file"; filename="frame.jpg"\r\n'
+        'Content-Type: image/jpeg\r\n\r\n'
+    ).encode() + image + f'\r\n--{boundary}--\r\n'.encode()
+    request = urllib.request.Request(url, data=body, headers={'Content-Type': f'multipart/form-data; boundary={boundary}'})
+    with urllib.request.urlopen(request) as response:
+        response.read()
+        return response.status
+
+def bench_api(images, clients, requests_per_client):
+    from werkzeug.serving import make_server
+    import api
+
+    server = make_server('127.0.0.1', 0, api.app, threaded=True)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    url = f'http://127.0.0.1:{server.server_port}/predict'
+    try:
+        _post_image(url, images[0]) # Warm-up
+        # Distinct images per request so that the prediction cache does not skew the numbers
+        total = clients * requests_per_client
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=clients) as pool:
+            statuses = list(pool.map(lambda i: _post_image(url, images[1 + i % (len(images) - 1)]), range(total)))
+        elapsed = time.perf_counter() - start
+    finally:
+        server.shutdown()
+    if any(status != 200 for status in statuses):
+        raise RuntimeError('/predict returned an error during the benchmark')
+    return {f'api_predict_c{clients}_rps': metric(total / elapsed, 'requests/s', True)}
+
+# --- Baseline Comparison ---
+
+def compare(results, baseline, tolerance):
+    """
+    Returns the metrics that are worse than the baseline by more than tolerance
+    (a fraction), as (name, baseline value, current value, relative change).
+    """
+    regressions = []
+    for name, current in results['metrics'].items():
+        previous = baseline['metrics'].get(name)
+        if not previous or not previous['value']:
+            continue
+        change = (current['value'] - previous['value']) / previous['value']
+        worse = -change if current['higher_is_better'] else change
+        if worse > tolerance:
+            regressions.append((name, previous['value'], current['value'], change))
+    return regressions
+
+def run(args):
+    random.seed(SEED)
+    torch.manual_seed(SEED)
+    if args.threads:
+        torch.set_num_threads(args.threads)
+    rng = random.Random(SEED)
+
+    workdir = tempfile.mkdtemp(prefix='trash_detect_bench_')
+    cwd = os.getcwd()
+    torch_home = os.environ.get('TORCH_HOME')
+    # Any pretrained weights fetched by torchvision (here or in the subprocesses)
+    # land in this empty directory, so a download cannot go unnoticed
+    os.environ['TORCH_HOME'] = os.path.join(workdir, 'torch_home')
+    try:
+        os.chdir(workdir) # inference.py and api.py resolve the checkpoint relative to the working directory
+        make_checkpoint('trash_detection_model.pth')
+        images = [make_image(rng) for _ in range(args.images)]
+        make_image_dir('images', args.images, rng)
+
+        metrics = {}
+        metrics.update(bench_cold_start(workdir))
+        model = load_model('trash_detection_model.pth', NUM_TRASH_CLASSES)
+        metrics.update(bench_single_image(model, images, args.repeats))
+        metrics.update(bench_batched_throughput(model, args.batch_sizes, args.seconds))
+        metrics.update(bench_train_step(args.train_batch_size, args.train_steps))
+        metrics.update(bench_dataloader('images', args.train_batch_size, args.loader_workers))
+        if not args.skip_api:
+            metrics.update(bench_api(images, args.clients, args.requests_per_client))
+        metrics['peak_rss_mb'] = metric(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 'MB', False)
+
+        downloaded = [name for _, _, files in os.walk(os.environ['TORCH_HOME']) for name in files]
+        if downloaded:
+            raise RuntimeError(f"Benchmarks downloaded pretrained weights, which skews the timings: {downloaded}")
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+        if torch_home is None:
+            os.environ.pop('TORCH_HOME', None)
+        else:
+            os.environ['TORCH_HOME'] = torch_home
+
+    return {
+        'meta': {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'torch': torch.__version__,
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'torch_threads': torch.get_num_threads(),
+        },
+        'metrics': metrics,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description='Trash detection performance benchmarks')
+    parser.add_argument('--output', help='Write results JSON to this file')
+    parser.add_argument('--baseline', help='Compare against this results JSON and exit 1 on regressions')
+    parser.add_argument('--save-baseline', help='Write results JSON as the new baseline')
+    parser.add_argument('--tolerance', type=float, default=0.10, help='Allowed relative slowdown before flagging (default 0.10)')
+    parser.add_argument('--threads', type=int, default=0, help='torch intra-op threads (default: torch default)')
+    parser.add_argument('--images', type=int, default=64)
+    parser.add_argument('--repeats', type=int, default=50)
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[1, 4, 8, 16, 32])
+    parser.add_argument('--seconds', type=float, default=3.0, help='Duration of each throughput measurement')
+    parser.add_argument('--train-batch-size', type=int, default=16)
+    parser.add_argument('--train-steps', type=int, default=5)
+    parser.add_argument('--loader-workers', type=int, nargs='+', default=[0, 2])
+    parser.add_argument('--clients', type=int, default=8)
+    parser.add_argument('--requests-per-client', type=int, default=4)
+    parser.add_argument('--skip-api', action='store_true', help='Skip the /predict end-to-end benchmark')
+    args = parser.parse_args()
+
+    results = run(args)
+    for name, value in sorted(results['metrics'].items()):
+        print(f"{name:40s} {value['value']:12.3f} {value['unit']}")
+
+    for path in (args.output, args.save_baseline):
+        if path:
+            with open(path, 'w') as f:
+                json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, 'r') as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance)
+        for name, previous, current, change in regressions:
+            print(f"REGRESSION {name}: {previous:.3f} -> {current:.3f} ({change:+.1%})")
+        if regressions:
+            sys.exit(1)
+        print('No regressions against baseline.')
+
+if __name__ == '__main__':
+    main()
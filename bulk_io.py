@@ -0,0 +1,342 @@
+import csv
+import io
+import json
+import datetime
+from itertools import islice
+
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+
+from .database import engine, User, DisposalRecord
+
+# --- Bulk Import / Export ---
+# Onboarding a ward means loading thousands of residents at once. Rows are read
+# from the upload as a stream, in chunks, so memory use does not grow with the
+# file size. Each chunk costs one set-based lookup for duplicates and one
+# executemany INSERT, instead of a query and a commit per row.
+
+DEFAULT_CHUNK_SIZE = 5000
+MAX_REPORTED_ERRORS = 1000
+
+USER_FIELDS = ['name', 'surname', 'aadhar_id', 'face_id', 'points', 'is_active', 'registered_at']
+DISPOSAL_FIELDS = ['user_id', 'cctv_location', 'timestamp', 'trash_type', 'disposed_properly',
+                   'points_awarded', 'footage_url']
+
+
+class ImportReport:
+    """
+    Summary of a bulk import. Per-row problems are collected here instead of
+    aborting the batch.
+    """
+    def __init__(self):
+        self.inserted = 0
+        self.duplicates = 0
+        self.errors = []  # (row number, message)
+        self.error_count = 0
+
+    def add_error(self, row_number, message):
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append((row_number, message))
+
+    def to_dict(self):
+        return {
+            'inserted': self.inserted,
+            'duplicates': self.duplicates,
+            'error_count': self.error_count,
+            'errors': self.errors,
+        }
+
+
+# --- Reading ---
+
+def _text_stream(stream):
+    # Uploaded files (werkzeug FileStorage.stream) are binary; wrap them so the
+    # csv/json readers can consume them lazily. Bytes that are not UTF-8 become
+    # U+FFFD, and the rows containing them are rejected by _clean_chunk.
+    if isinstance(stream, io.TextIOBase):
+        return stream
+    return io.TextIOWrapper(stream, encoding='utf-8-sig', errors='replace', newline='')
+
+
+def iter_rows(stream, fmt):
+    """
+    Yields (row number, dict) pairs from a CSV file or a JSON Lines file
+    (one object per line), without loading the whole file. Rows that cannot
+    be parsed are yielded as (row number, ValueError) so the import goes on.
+    """
+    text = _text_stream(stream)
+    if fmt == 'csv':
+        reader = csv.DictReader(text)
+        row_number = 1  # Row 1 is the header
+        while True:
+            row_number += 1
+            try:
+                row = next(reader)
+            except StopIteration:
+                return
+            except csv.Error as e:
+                yield row_number, ValueError(f"unreadable CSV row: {e}")
+                continue
+            yield row_number, row
+    elif fmt == 'json':
+        for row_number, line in enumerate(text, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError as e:
+                yield row_number, ValueError(f"invalid JSON: {e}")
+                continue
+            yield row_number, row
+    else:
+        raise ValueError(f"Unsupported format: {fmt}")
+
+
+def iter_chunks(rows, chunk_size):
+    rows = iter(rows)
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+# --- Field parsing ---
+
+def _parse_bool(value, default=None):
+    if value is None or value == '':
+        return default
+    if isinstance(value, bool):
+        return value
+    value = str(value).strip().lower()
+    if value in ('1', 'true', 'yes', 'y'):
+        return True
+    if value in ('0', 'false', 'no', 'n'):
+        return False
+    raise ValueError(f"invalid boolean '{value}'")
+
+
+def _parse_int(value, default=None):
+    if value is None or value == '':
+        return default
+    return int(value)
+
+
+def _parse_datetime(value, default=None):
+    if value is None or value == '':
+        return default
+    return datetime.datetime.fromisoformat(str(value))
+
+
+def _parse_text(value):
+    # JSON Lines values may be numbers or other non-strings; store them as text
+    if value is None:
+        return ''
+    return str(value).strip()
+
+
+def _clean_user(row):
+    name = _parse_text(row.get('name'))
+    aadhar_id = _parse_text(row.get('aadhar_id'))
+    if not name:
+        raise ValueError("missing name")
+    if not aadhar_id:
+        raise ValueError("missing aadhar_id")
+    return {
+        'name': name,
+        'surname': _parse_text(row.get('surname')),
+        'aadhar_id': aadhar_id,
+        # Same simulated face_id as register()
+        'face_id': _parse_text(row.get('face_id')) or f"face_{aadhar_id}",
+        'points': _parse_int(row.get('points'), 0),
+        'is_active': _parse_bool(row.get('is_active'), True),
+        'registered_at': _parse_datetime(row.get('registered_at'), datetime.datetime.now()),
+    }
+
+
+def _clean_disposal(row):
+    user_id = _parse_int(row.get('user_id'))
+    if user_id is None:
+        raise ValueError("missing user_id")
+    return {
+        'user_id': user_id,
+        'cctv_location': _parse_text(row.get('cctv_location')) or None,
+        'timestamp': _parse_datetime(row.get('timestamp'), datetime.datetime.now()),
+        'trash_type': _parse_text(row.get('trash_type')) or None,
+        'disposed_properly': _parse_bool(row.get('disposed_properly')),
+        'points_awarded': _parse_int(row.get('points_awarded'), 0),
+        'footage_url': _parse_text(row.get('footage_url')) or None,
+    }
+
+
+def _clean_chunk(chunk, clean, report):
+    cleaned = []
+    for row_number, row in chunk:
+        if isinstance(row, Exception):
+            report.add_error(row_number, str(row))
+            continue
+        if not isinstance(row, dict):
+            report.add_error(row_number, "row is not an object")
+            continue
+        if any(isinstance(value, str) and ('\ufffd' in value or '\x00' in value) for value in row.values()):
+            report.add_error(row_number, "row contains bytes that are not valid UTF-8 text")
+            continue
+        try:
+            cleaned.append((row_number, clean(row)))
+        except (ValueError, TypeError) as e:
+            report.add_error(row_number, str(e))
+    return cleaned
+
+
+def _insert_chunk(table, rows, report):
+    """
+    Inserts a chunk with a single executemany in one transaction. If the chunk
+    violates a constraint, it is retried row by row so that only the offending
+    rows are reported and the rest still go in.
+    """
+    if not rows:
+        return
+    try:
+        with engine.begin() as conn:
+            conn.execute(table.insert(), [values for _, values in rows])
+        report.inserted += len(rows)
+        return
+    except IntegrityError:
+        pass
+
+    for row_number, values in rows:
+        try:
+            with engine.begin() as conn:
+                conn.execute(table.insert(), values)
+            report.inserted += 1
+        except IntegrityError as e:
+            report.add_error(row_number, f"constraint violation: {e.orig}")
+
+
+# --- Import ---
+
+def import_users(stream, fmt='csv', chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Bulk-registers users from a CSV or JSON Lines stream. Rows whose aadhar_id
+    is already registered (or repeated earlier in the file) are counted as
+    duplicates and skipped.
+    """
+    report = ImportReport()
+    table = User.__table__
+    for chunk in iter_chunks(iter_rows(stream, fmt), chunk_size):
+        cleaned = _clean_chunk(chunk, _clean_user, report)
+
+        # Deduplicate within the chunk first, then against the database with one query.
+        unique = {}
+        for row_number, values in cleaned:
+            if values['aadhar_id'] in unique:
+                report.duplicates += 1
+            else:
+                unique[values['aadhar_id']] = (row_number, values)
+
+        with engine.connect() as conn:
+            existing = set(conn.execute(
+                select(table.c.aadhar_id).where(table.c.aadhar_id.in_(list(unique)))
+            ).scalars())
+            face_ids = {values['face_id'] for _, values in unique.values()}
+            taken_faces = set(conn.execute(
+                select(table.c.face_id).where(table.c.face_id.in_(list(face_ids)))
+            ).scalars())
+
+        rows = []
+        for aadhar_id, (row_number, values) in unique.items():
+            if aadhar_id in existing:
+                report.duplicates += 1
+            elif values['face_id'] in taken_faces:
+                report.add_error(row_number, f"face_id {values['face_id']} is already registered")
+            else:
+                taken_faces.add(values['face_id'])
+                rows.append((row_number, values))
+        _insert_chunk(table, rows, report)
+    return report
+
+
+def import_disposal_records(stream, fmt='csv', chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Bulk-loads disposal records from a CSV or JSON Lines stream. Records that
+    reference an unknown user_id are reported as errors.
+    """
+    report = ImportReport()
+    table = DisposalRecord.__table__
+    users = User.__table__
+    for chunk in iter_chunks(iter_rows(stream, fmt), chunk_size):
+        cleaned = _clean_chunk(chunk, _clean_disposal, report)
+        user_ids = {values['user_id'] for _, values in cleaned}
+
+        with engine.connect() as conn:
+            known = set(conn.execute(
+                select(users.c.id).where(users.c.id.in_(list(user_ids)))
+            ).scalars())
+
+        rows = []
+        for row_number, values in cleaned:
+            if values['user_id'] in known:
+                rows.append((row_number, values))
+            else:
+                report.add_error(row_number, f"unknown user_id {values['user_id']}")
+        _insert_chunk(table, rows, report)
+    return report
+
+
+# --- Export ---
+
+def _serialize(value):
+    if isinstance(value, datetime.datetime):
+        return value.isoformat()
+    return value
+
+
+def _iter_table(model, fields, chunk_size):
+    # Keyset pagination on the primary key keeps each page query cheap and
+    # avoids holding one huge result set open.
+    table = model.__table__
+    columns = [table.c.id] + [table.c[field] for field in fields]
+    last_id = 0
+    while True:
+        with engine.connect() as conn:
+            page = conn.execute(
+                select(*columns).where(table.c.id > last_id).order_by(table.c.id).limit(chunk_size)
+            ).all()
+        if not page:
+            return
+        for row in page:
+            yield row
+        last_id = page[-1][0]
+
+
+def export_rows(model, fmt='csv', chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Yields the contents of a table as CSV or JSON Lines text, a few rows at a
+    time, suitable for a streamed Flask response.
+    """
+    fields = USER_FIELDS if model is User else DISPOSAL_FIELDS
+    header = ['id'] + fields
+    if fmt == 'csv':
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(header)
+        for i, row in enumerate(_iter_table(model, fields, chunk_size), start=1):
+            writer.writerow([_serialize(value) for value in row])
+            if i % chunk_size == 0:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+        yield buffer.getvalue()
+    elif fmt == 'json':
+        lines = []
+        for row in _iter_table(model, fields, chunk_size):
+            lines.append(json.dumps({key: _serialize(value) for key, value in zip(header, row)}))
+            if len(lines) >= chunk_size:
+                yield '\n'.join(lines) + '\n'
+                lines = []
+        if lines:
+            yield '\n'.join(lines) + '\n'
+    else:
+        raise ValueError(f"Unsupported format: {fmt}")
@@ -1,3 +1,4 @@
+import os
 from sqlalchemy import create_engine, Column, Integer, String, Boolean, DateTime, Float
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
@@ -5,7 +6,7 @@ import datetime
 
 # --- Database Configuration ---
 # For simplicity, using SQLite. In production, consider PostgreSQL or MySQL.
-DATABASE_URL = "sqlite:///./trash_detection.db"
+DATABASE_URL = os.environ.get("DATABASE_URL", "sqlite:///./trash_detection.db")
 
 engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
@@ -31,12 +32,48 @@ class DisposalRecord(Base):
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, index=True) # Foreign key to User
     cctv_location = Column(String)
-    timestamp = Column(DateTime, default=datetime.datetime.now)
+    timestamp = Column(DateTime, default=datetime.datetime.now, index=True) # Used by the archive cutoff
     trash_type = Column(String)
     disposed_properly = Column(Boolean)
     points_awarded = Column(Integer)
     footage_url = Column(String) # URL to short disposal footage
 
+class Camera(Base):
+    __tablename__ = "cameras"
+
+    id = Column(Integer, primary_key=True, index=True)
+    location = Column(String, unique=True, index=True) # Matches DisposalRecord.cctv_location
+    stream_url = Column(String) # RTSP/HTTP URL or file path readable by OpenCV
+    sample_fps = Column(Float, default=2.0) # Frames per second sent to the model
+    roi = Column(String, nullable=True) # Regions of interest as "x_min,y_min,x_max,y_max;..." in pixels
+    tile_size = Column(Integer, nullable=True) # Split each region into overlapping tiles of this size
+    motion_threshold = Column(Float, default=0.02) # Mean abs frame difference (0-1) needed to run the model
+    backbone = Column(String, default="resnet50") # See model.BACKBONE_FEATURE_SIZES
+    is_active = Column(Boolean, default=True)
+
+    def to_config(self):
+        """
+        Plain-dict settings for handing a camera to an inference worker process.
+        """
+        rois = [[int(v) for v in roi.split(",")] for roi in self.roi.split(";")] if self.roi else None
+        return {
+            'location': self.location,
+            'stream_url': self.stream_url,
+            'sample_fps': self.sample_fps,
+            'rois': rois,
+            'tile_size': self.tile_size,
+            'motion_threshold': self.motion_threshold,
+            'backbone': self.backbone,
+        }
+
+class ArchivedUserMonth(Base):
+    __tablename__ = "archived_user_months"
+
+    # Which archive months hold a user's disposal records, so their history
+    # reads only those partitions instead of every archived file
+    user_id = Column(Integer, primary_key=True)
+    month = Column(String, primary_key=True) # "YYYY-MM", as in the archive's month partitions
+
 class IssueReport(Base):
     __tablename__ = "issue_reports"
 
@@ -55,5 +92,17 @@ def create_db_and_tables():
     Base.metadata.create_all(engine)
     print("Database tables created or already exist.")
 
+_tables_ready = False
+
+def ensure_db_and_tables():
+    """
+    Creates the tables once per process. The web apps call this before their
+    first request instead of at import time, so importing them stays cheap.
+    """
+    global _tables_ready
+    if not _tables_ready:
+        create_db_and_tables()
+        _tables_ready = True
+
 if __name__ == "__main__":
     create_db_and_tables()
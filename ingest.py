@@ -0,0 +1,371 @@
+import os
+import re
+import sys
+import json
+import time
+import uuid
+import asyncio
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+from aiohttp import web
+
+# Add the model directory to the Python path; its modules import each other by file name
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'model'))
+from inference import DEFAULT_MODEL_PATH
+
+# --- Streaming Footage Ingestion ---
+# Large CCTV clips are uploaded in chunks to an asyncio server instead of
+# through synchronous Flask handlers that buffer the whole file. Each chunk is
+# appended to storage as it arrives while its SHA-256 is updated, so nothing is
+# held in memory. Uploads are resumable: HEAD returns the stored offset and the
+# client continues with a PATCH from there. Frames are handed to the model as
+# soon as the partial file can be decoded (streamable containers such as
+# MPEG-TS, MKV or fragmented MP4), not after the transfer finishes.
+#
+# Protocol:
+#   POST  /uploads               Upload-Length: <bytes> (optional), X-Filename: <name>
+#                                -> 201 {"upload_id": ...}
+#   HEAD  /uploads/<id>          -> Upload-Offset: <bytes stored>
+#   PATCH /uploads/<id>          Upload-Offset: <bytes stored>, body = next chunk(s),
+#                                Upload-Complete: 1 on the last request if no length was given
+#                                (rejected with 400 while a declared length is not reached)
+#   GET   /uploads/<id>          -> status, sha256 once complete, detections so far,
+#                                   error if the analysis failed
+
+STORAGE_DIR = os.environ.get('INGEST_STORAGE_DIR', 'uploads')
+CHUNK_SIZE = 256 * 1024
+SAMPLE_EVERY_N_FRAMES = 15 # Frames sent to the model: one in every N decoded frames
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg')
+UPLOAD_ID_PATTERN = re.compile(r'^[0-9a-f]{32}$')
+UPLOAD_EXPIRY = float(os.environ.get('INGEST_UPLOAD_EXPIRY', 24 * 3600)) # Seconds without a chunk before an incomplete upload is deleted
+SWEEP_INTERVAL = 600 # Seconds between expiry sweeps
+
+# File I/O and decoding run in threads so they never block the event loop; the
+# model gets its own single thread so concurrent uploads do not oversubscribe
+# torch's intra-op thread pool.
+io_executor = ThreadPoolExecutor(max_workers=4)
+model_executor = ThreadPoolExecutor(max_workers=1)
+
+class Upload:
+    def __init__(self, upload_id, filename, length=None, offset=0, sha256=None, complete=False):
+        self.upload_id = upload_id
+        self.filename = filename
+        self.length = length
+        self.offset = offset
+        self.sha256 = sha256
+        self.complete = complete
+        self.hasher = None
+        self.lock = asyncio.Lock() # One PATCH at a time per upload
+        self.data_ready = asyncio.Event()
+        self.detections = []
+        self.analysis = None
+        self.analysed = False
+        self.error = None # Why the analysis failed, if it did
+        self.touched = time.time() # Last time a chunk arrived
+
+    @property
+    def extension(self):
+        return os.path.splitext(self.filename)[1].lower()
+
+    @property
+    def data_path(self):
+        return os.path.join(STORAGE_DIR, f'{self.upload_id}{self.extension}.part')
+
+    @property
+    def meta_path(self):
+        return os.path.join(STORAGE_DIR, f'{self.upload_id}.json')
+
+    def save_meta(self):
+        with open(self.meta_path, 'w') as f:
+            json.dump({
+                'filename': self.filename,
+                'length': self.length,
+                'sha256': self.sha256,
+                'complete': self.complete,
+                'analysed': self.analysed,
+                'error': self.error,
+                'detections': self.detections,
+            }, f)
+
+    def to_dict(self):
+        return {
+            'upload_id': self.upload_id,
+            'filename': self.filename,
+            'length': self.length,
+            'offset': self.offset,
+            'complete': self.complete,
+            'sha256': self.sha256,
+            'detections': self.detections,
+            'error': self.error,
+        }
+
+# Upload id -> Upload, for uploads still arriving or being analysed. Finished
+# uploads are dropped once their results are saved in the meta file.
+uploads = {}
+
+def _hash_file(path):
+    hasher = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(CHUNK_SIZE), b''):
+            hasher.update(block)
+    return hasher
+
+async def get_upload(upload_id):
+    """
+    Returns the upload from memory, or restores it from storage so that a
+    client can resume after a server restart.
+    """
+    if not UPLOAD_ID_PATTERN.match(upload_id):
+        raise web.HTTPNotFound()
+    if upload_id in uploads:
+        return uploads[upload_id]
+    meta_path = os.path.join(STORAGE_DIR, f'{upload_id}.json')
+    if not os.path.exists(meta_path):
+        raise web.HTTPNotFound()
+    with open(meta_path, 'r') as f:
+        meta = json.load(f)
+    upload = Upload(upload_id, meta['filename'], meta['length'], sha256=meta['sha256'], complete=meta['complete'])
+    upload.analysed = meta.get('analysed', False)
+    upload.error = meta.get('error')
+    upload.detections = meta.get('detections', [])
+    if upload.complete:
+        upload.offset = os.path.getsize(stored_path(upload)) if os.path.exists(stored_path(upload)) else 0
+        if upload.analysed:
+            return upload # Finished; served from the meta file without being kept in memory
+        # The server stopped before the analysis finished; run it again on the stored file
+        upload.detections = []
+        upload.data_ready.set()
+    else:
+        loop = asyncio.get_running_loop()
+        if os.path.exists(upload.data_path):
+            upload.offset = os.path.getsize(upload.data_path)
+            upload.touched = os.path.getmtime(upload.data_path)
+            # The running hash is not persisted; rebuild it from the stored prefix once
+            upload.hasher = await loop.run_in_executor(io_executor, _hash_file, upload.data_path)
+            if upload_id in uploads:
+                # Another request restored it while we were hashing; there must be only
+                # one Upload (one lock, one analysis task) per id
+                return uploads[upload_id]
+        else:
+            upload.hasher = hashlib.sha256()
+    upload.analysis = asyncio.ensure_future(run_analysis(upload))
+    uploads[upload_id] = upload
+    return upload
+
+def expire_uploads(now=None):
+    """
+    Deletes incomplete uploads that have not received a chunk for
+    UPLOAD_EXPIRY seconds: their analysis task, their entry in uploads and
+    their .part and meta files, including ones abandoned before a restart.
+    Returns the expired upload ids.
+    """
+    now = time.time() if now is None else now
+    expired = []
+    for upload_id, upload in list(uploads.items()):
+        if not upload.complete and not upload.lock.locked() and now - upload.touched > UPLOAD_EXPIRY:
+            if upload.analysis:
+                upload.analysis.cancel()
+            del uploads[upload_id]
+            expired.append(upload)
+    expired_ids = {upload.upload_id for upload in expired}
+
+    # Uploads abandoned before a restart only exist on disk
+    for filename in os.listdir(STORAGE_DIR):
+        upload_id, extension = os.path.splitext(filename)
+        meta_path = os.path.join(STORAGE_DIR, filename)
+        if extension != '.json' or not UPLOAD_ID_PATTERN.match(upload_id) or upload_id in uploads:
+            continue
+        if now - os.path.getmtime(meta_path) <= UPLOAD_EXPIRY:
+            continue
+        with open(meta_path, 'r') as f:
+            meta = json.load(f)
+        upload = Upload(upload_id, meta['filename'])
+        if meta['complete'] or upload_id in expired_ids:
+            continue
+        if os.path.exists(upload.data_path) and now - os.path.getmtime(upload.data_path) <= UPLOAD_EXPIRY:
+            continue
+        expired.append(upload)
+
+    for upload in expired:
+        for path in (upload.data_path, upload.meta_path):
+            if os.path.exists(path):
+                os.remove(path)
+    return [upload.upload_id for upload in expired]
+
+async def sweep_expired_uploads(app):
+    # aiohttp cleanup context: runs expire_uploads() periodically while the app is up
+    async def sweep():
+        while True:
+            await asyncio.sleep(SWEEP_INTERVAL)
+            expire_uploads()
+    task = asyncio.ensure_future(sweep())
+    yield
+    task.cancel()
+
+# --- Inference Hand-off ---
+
+def _read_new_frames(path, start_frame, complete):
+    """
+    Decodes frames of a (possibly partial) video from start_frame on and
+    returns the sampled ones plus the index to resume from. While the upload is
+    incomplete the last decoded frame is held back, as it may be truncated.
+    """
+    import cv2
+    capture = cv2.VideoCapture(path)
+    if not capture.isOpened():
+        return [], start_frame # Not decodable yet (e.g. header still missing)
+    capture.set(cv2.CAP_PROP_POS_FRAMES, start_frame)
+    decoded = []
+    index = start_frame
+    while True:
+        ok, frame = capture.read()
+        if not ok:
+            break
+        decoded.append((index, frame))
+        index += 1
+    capture.release()
+    if not complete and decoded:
+        decoded.pop()
+        index -= 1
+    return [(i, frame) for i, frame in decoded if i % SAMPLE_EVERY_N_FRAMES == 0], index
+
+def _predict_frame(frame):
+    from PIL import Image
+    from inference import get_model, get_category_names, predict_image
+    model = get_model(DEFAULT_MODEL_PATH)
+    return predict_image(model, Image.fromarray(frame[:, :, ::-1]), class_names=get_category_names())
+
+def _predict_file(path):
+    from inference import predict
+    return predict(path)['detections']
+
+async def analyse(upload):
+    """
+    Runs the model on an upload while it is still arriving: after every stored
+    chunk, any newly decodable frames are sent to the model. Images are only
+    analysed once complete.
+    """
+    loop = asyncio.get_running_loop()
+    next_frame = 0
+    while True:
+        await upload.data_ready.wait()
+        upload.data_ready.clear()
+        complete = upload.complete
+        path = upload.data_path if not complete else stored_path(upload)
+
+        if upload.extension in IMAGE_EXTENSIONS:
+            if complete:
+                detections = await loop.run_in_executor(model_executor, _predict_file, path)
+                upload.detections.append({'frame': 0, 'detections': detections})
+        else:
+            frames, next_frame = await loop.run_in_executor(io_executor, _read_new_frames, path, next_frame, complete)
+            for index, frame in frames:
+                detections = await loop.run_in_executor(model_executor, _predict_frame, frame)
+                upload.detections.append({'frame': index, 'detections': detections})
+        if complete:
+            return
+
+async def run_analysis(upload):
+    """
+    Runs analyse() for an upload and records a failure on the upload, where
+    GET /uploads/<id> reports it, instead of losing it in an unobserved task.
+    """
+    try:
+        await analyse(upload)
+    except Exception as e:
+        upload.error = f'{type(e).__name__}: {e}'
+    upload.analysed = True
+    release(upload)
+
+def release(upload):
+    # Once an upload is complete and analysed its results live in the meta file only
+    if upload.complete and upload.analysed:
+        upload.save_meta()
+        uploads.pop(upload.upload_id, None)
+
+def stored_path(upload):
+    # Completed files are content-addressed, so identical footage is stored once
+    return os.path.join(STORAGE_DIR, f'{upload.sha256}{upload.extension}')
+
+# --- Handlers ---
+
+async def create_upload(request):
+    filename = os.path.basename(request.headers.get('X-Filename', ''))
+    if not filename:
+        raise web.HTTPBadRequest(text='X-Filename header is required')
+    length = request.headers.get('Upload-Length')
+    try:
+        length = int(length) if length else None
+    except ValueError:
+        length = -1
+    if length is not None and length < 0:
+        raise web.HTTPBadRequest(text='Upload-Length must be a non-negative integer')
+    upload = Upload(uuid.uuid4().hex, filename, length)
+    upload.hasher = hashlib.sha256()
+    open(upload.data_path, 'wb').close()
+    upload.save_meta()
+    upload.analysis = asyncio.ensure_future(run_analysis(upload))
+    uploads[upload.upload_id] = upload
+    return web.json_response(upload.to_dict(), status=201, headers={'Location': f'/uploads/{upload.upload_id}'})
+
+async def upload_offset(request):
+    upload = await get_upload(request.match_info['upload_id'])
+    headers = {'Upload-Offset': str(upload.offset), 'Cache-Control': 'no-store'}
+    if upload.length is not None:
+        headers['Upload-Length'] = str(upload.length)
+    return web.Response(headers=headers)
+
+async def append_chunk(request):
+    upload = await get_upload(request.match_info['upload_id'])
+    loop = asyncio.get_running_loop()
+    async with upload.lock:
+        if upload.complete:
+            raise web.HTTPConflict(text='Upload is already complete')
+        upload.touched = time.time()
+        if request.headers.get('Upload-Offset') != str(upload.offset):
+            # Client and server disagree; the client must HEAD and resume from our offset
+            raise web.HTTPConflict(headers={'Upload-Offset': str(upload.offset)})
+
+        with open(upload.data_path, 'ab') as f:
+            async for chunk in request.content.iter_chunked(CHUNK_SIZE):
+                if upload.length is not None and upload.offset + len(chunk) > upload.length:
+                    raise web.HTTPRequestEntityTooLarge(max_size=upload.length, actual_size=upload.offset + len(chunk))
+                await loop.run_in_executor(io_executor, f.write, chunk)
+                upload.hasher.update(chunk)
+                upload.offset += len(chunk)
+            await loop.run_in_executor(io_executor, f.flush)
+
+        completing = request.headers.get('Upload-Complete') == '1'
+        if completing and upload.length is not None and upload.offset != upload.length:
+            # The chunk is kept; the client can resume and send the rest
+            upload.data_ready.set()
+            raise web.HTTPBadRequest(text='Upload-Complete sent before Upload-Length was reached',
+                                     headers={'Upload-Offset': str(upload.offset)})
+        if upload.offset == upload.length or completing:
+            upload.sha256 = upload.hasher.hexdigest()
+            if os.path.exists(stored_path(upload)):
+                os.remove(upload.data_path) # Same footage already stored
+            else:
+                os.replace(upload.data_path, stored_path(upload))
+            upload.complete = True
+            upload.save_meta()
+            release(upload) # The analysis may already have stopped on an error
+        upload.data_ready.set()
+    return web.Response(status=204, headers={'Upload-Offset': str(upload.offset)})
+
+async def upload_status(request):
+    upload = await get_upload(request.match_info['upload_id'])
+    return web.json_response(upload.to_dict())
+
+def create_app():
+    os.makedirs(STORAGE_DIR, exist_ok=True)
+    app = web.Application()
+    app.cleanup_ctx.append(sweep_expired_uploads)
+    app.router.add_post('/uploads', create_upload)
+    app.router.add_route('HEAD', '/uploads/{upload_id}', upload_offset)
+    app.router.add_patch('/uploads/{upload_id}', append_chunk)
+    app.router.add_get('/uploads/{upload_id}', upload_status, allow_head=False)
+    return app
+
+if __name__ == '__main__':
+    web.run_app(create_app(), port=5003)
@@ -0,0 +1,159 @@
+import io
+import os
+import json
+import hashlib
+import threading
+from collections import OrderedDict, namedtuple
+
+# --- Prediction Cache ---
+# Cameras re-upload the same keyframes, retries resend identical files and
+# static scenes produce near-identical frames. Results are cached under the
+# SHA-256 of the image bytes. Near-duplicate matching is opt-in: on an exact
+# miss, a 64-bit difference hash (dHash) of the image finds near-duplicates
+# within a small Hamming distance. It only suits whole-image results where
+# small changes do not matter; a bottle entering a corner of a static CCTV
+# scene moves the hash by a bit or two, so it is off by default.
+# Entries are tied to the model version, so a new checkpoint invalidates them.
+
+CacheKey = namedtuple('CacheKey', ['content_hash', 'perceptual_hash', 'model_version'])
+
+def model_version(checkpoint_path):
+    """
+    Cheap fingerprint of a checkpoint file. It changes whenever the file is
+    rewritten, without hashing hundreds of megabytes on every request.
+    """
+    try:
+        stat = os.stat(checkpoint_path)
+    except OSError:
+        return 'missing'
+    return f'{stat.st_size}-{stat.st_mtime_ns}'
+
+def perceptual_hash(image_bytes, hash_size=8):
+    """
+    dHash: compares neighbouring pixels of a tiny grayscale thumbnail, so small
+    changes in noise, compression or lighting leave most bits unchanged.
+    """
+    from PIL import Image
+    image = Image.open(io.BytesIO(image_bytes)).convert('L').resize((hash_size + 1, hash_size))
+    pixels = image.tobytes() # One byte per pixel in mode 'L'
+    value = 0
+    for row in range(hash_size):
+        for col in range(hash_size):
+            left = pixels[row * (hash_size + 1) + col]
+            right = pixels[row * (hash_size + 1) + col + 1]
+            value = (value << 1) | (left > right)
+    return value
+
+def _hamming(a, b):
+    return bin(a ^ b).count('1')
+
+class PredictionCache:
+    """
+    Two-tier cache of prediction results: an LRU in memory bounded by entry
+    count and approximate size, and an optional directory of JSON files that
+    survives restarts.
+    """
+    def __init__(self, max_entries=1024, max_bytes=64 * 1024 * 1024, disk_dir=None, max_distance=None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.disk_dir = disk_dir
+        self.max_distance = max_distance # Largest dHash Hamming distance counted as a near-duplicate; None for exact matches only
+        self._entries = OrderedDict() # content hash -> (result, size, perceptual hash)
+        self._bytes = 0
+        self._version = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.near_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+
+    def _check_version(self, version):
+        if version == self._version:
+            return
+        # New checkpoint: drop everything cached for other model versions,
+        # including disk entries left over from a previous run
+        self._entries.clear()
+        self._bytes = 0
+        self._version = version
+        if self.disk_dir:
+            for filename in os.listdir(self.disk_dir):
+                if filename.endswith('.json') and not filename.startswith(f'{version}-'):
+                    os.remove(os.path.join(self.disk_dir, filename))
+
+    def _disk_path(self, key):
+        return os.path.join(self.disk_dir, f'{key.model_version}-{key.content_hash}.json')
+
+    def _store(self, content_hash, result, phash):
+        size = len(json.dumps(result))
+        if content_hash in self._entries:
+            self._bytes -= self._entries.pop(content_hash)[1]
+        self._entries[content_hash] = (result, size, phash)
+        self._bytes += size
+        while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+            _, (_, evicted_size, _) = self._entries.popitem(last=False)
+            self._bytes -= evicted_size
+
+    def get(self, image_bytes, version):
+        """
+        Returns (result, key). result is None on a miss; pass key to put() once
+        the prediction has been computed.
+        """
+        content_hash = hashlib.sha256(image_bytes).hexdigest()
+        with self._lock:
+            self._check_version(version)
+            entry = self._entries.get(content_hash)
+            if entry:
+                self._entries.move_to_end(content_hash)
+                self.hits += 1
+                return entry[0], CacheKey(content_hash, entry[2], version)
+
+        phash = None
+        if self.max_distance is not None:
+            try:
+                phash = perceptual_hash(image_bytes)
+            except Exception:
+                pass # Not a decodable image; only exact matches apply
+        key = CacheKey(content_hash, phash, version)
+
+        if self.disk_dir and os.path.exists(self._disk_path(key)):
+            with open(self._disk_path(key), 'r') as f:
+                result = json.load(f)
+            with self._lock:
+                self._store(content_hash, result, phash)
+                self.disk_hits += 1
+            return result, key
+
+        with self._lock:
+            if phash is not None:
+                for cached_hash, (result, _, cached_phash) in self._entries.items():
+                    if cached_phash is not None and _hamming(phash, cached_phash) <= self.max_distance:
+                        self._entries.move_to_end(cached_hash)
+                        self.near_hits += 1
+                        return result, key
+            self.misses += 1
+        return None, key
+
+    def put(self, key, result):
+        with self._lock:
+            if key.model_version != self._version:
+                return # Model changed while this prediction was running
+            self._store(key.content_hash, result, key.perceptual_hash)
+        if self.disk_dir:
+            with open(self._disk_path(key), 'w') as f:
+                json.dump(result, f)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.near_hits + self.disk_hits + self.misses
+            return {
+                'hits': self.hits,
+                'near_duplicate_hits': self.near_hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'hit_rate': (lookups - self.misses) / lookups if lookups else 0.0,
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'model_version': self._version,
+            }
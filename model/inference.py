@@ -1,46 +1,154 @@
+import time
+import zipfile
+import threading
 
-import torch
-from torchvision import transforms
-from model import TrashDetectionModel
-from PIL import Image
+# torch, torchvision, PIL and the model modules are imported on first use, so
+# importing this module (e.g. from api.py) does not pay for them at startup.
 
-def predict(image_path, model_path='trash_detection_model.pth', num_trash_classes=60):
+DEFAULT_MODEL_PATH = 'trash_detection_model.pth'
+
+# Seconds spent in each startup step of the most recent model load, for /metrics and the benchmarks
+startup_timings = {}
+
+_models = {} # (model path, classes, backbone) -> (checkpoint fingerprint, model)
+_models_lock = threading.Lock()
+_category_names = {} # (categories file, classes) -> class names
+
+def _timed(step, func, *args, **kwargs):
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    startup_timings[step] = time.perf_counter() - start
+    return result
+
+def _import_torch():
+    import torch
+    import torchvision
+    return torch
+
+def checkpoint_path(backbone='resnet50'):
+    """
+    Returns the checkpoint file for a backbone. The default resnet50 model keeps
+    the original file name.
+    """
+    if backbone == 'resnet50':
+        return DEFAULT_MODEL_PATH
+    return f'trash_detection_model_{backbone}.pth'
+
+def load_model(model_path=DEFAULT_MODEL_PATH, num_trash_classes=60, backbone='resnet50'):
     """
-    Performs inference on a single image.
+    Loads a trained model in eval mode so it can be reused across many images.
+
+    The skeleton is built without pretrained weights (the checkpoint replaces
+    them anyway) on the meta device, so no parameter memory is allocated or
+    initialised, and the checkpoint is memory-mapped and assigned in place.
+    Older torch versions without meta/mmap support, and legacy (non-zip)
+    checkpoints that cannot be memory-mapped, fall back to a normal load.
     """
-    # Load the model
-    model = TrashDetectionModel(num_trash_classes=num_trash_classes)
-    model.load_state_dict(torch.load(model_path))
+    startup_timings.clear() # Cleared in place; api.py holds a reference to this dict
+    torch = _timed('import_torch_s', _import_torch)
+    from model import TrashDetectionModel
+
+    model = None
+    # Legacy (non-zip) checkpoints cannot be memory-mapped. Checking up front
+    # means a real key or shape mismatch is raised once, not retried.
+    if zipfile.is_zipfile(model_path):
+        try:
+            with torch.device('meta'):
+                model = _timed('construct_model_s', TrashDetectionModel,
+                               num_trash_classes=num_trash_classes, pretrained=False, backbone=backbone)
+            state_dict = _timed('load_checkpoint_s', torch.load, model_path,
+                                map_location='cpu', mmap=True, weights_only=True)
+            model.load_state_dict(state_dict, assign=True)
+        except (AttributeError, TypeError):
+            model = None # torch without meta device, mmap or assign support
+    if model is None:
+        model = _timed('construct_model_s', TrashDetectionModel,
+                       num_trash_classes=num_trash_classes, pretrained=False, backbone=backbone)
+        model.load_state_dict(_timed('load_checkpoint_s', torch.load, model_path, map_location='cpu'))
     model.eval()
+    return model
+
+def get_model(model_path=DEFAULT_MODEL_PATH, num_trash_classes=60, backbone='resnet50'):
+    """
+    Returns a process-wide loaded model, reloading it when the checkpoint file
+    changes.
+    """
+    from cache import model_version
+    key = (model_path, num_trash_classes, backbone)
+    version = model_version(model_path)
+    with _models_lock:
+        cached = _models.get(key)
+        if cached and cached[0] == version:
+            return cached[1]
+        model = load_model(model_path, num_trash_classes, backbone)
+        _models[key] = (version, model)
+        return model
+
+def get_category_names(num_classes=60, categories_file=None):
+    """
+    Returns the trash class names, read from the categories file once per
+    process. Defaults to postprocess.DEFAULT_CATEGORIES_PATH.
+    """
+    from postprocess import load_category_names, DEFAULT_CATEGORIES_PATH
+    key = (categories_file or DEFAULT_CATEGORIES_PATH, num_classes)
+    if key not in _category_names:
+        _category_names[key] = load_category_names(key[0], num_classes)
+    return _category_names[key]
 
-    # Define transformations
-    data_transform = transforms.Compose([
-        transforms.Resize((224, 224)),
-        transforms.ToTensor(),
-        transforms.Normalize(mean=[0.485, 0.456, 0.406], std=[0.229, 0.224, 0.225])
-    ])
+def predict_image(model, image, class_names=None, **thresholds):
+    """
+    Performs inference on a single PIL image with an already loaded model and
+    returns its post-processed detections.
+    """
+    import torch
+    from preprocess import data_transform
+    from postprocess import postprocess
 
-    # Load and preprocess the image
-    image = Image.open(image_path).convert("RGB")
-    image = data_transform(image).unsqueeze(0)
+    image = data_transform(image.convert("RGB")).unsqueeze(0)
 
     # Perform inference
     with torch.no_grad():
-        person_bbox, person_logits, face_embedding, trash_logits, disposal_logits = model(image)
-
-    # Post-process the output
-    # This is a simplified post-processing step. In a real scenario, you would need to apply non-maximum suppression for bounding boxes and convert logits to probabilities.
-    person_class = torch.argmax(person_logits, dim=1).item()
-    trash_class = torch.argmax(trash_logits, dim=1).item()
-    disposal_class = torch.argmax(disposal_logits, dim=1).item()
-
-    return {
-        'person_bbox': person_bbox.tolist(),
-        'person_class': person_class,
-        'face_embedding': face_embedding.tolist(),
-        'trash_class': trash_class,
-        'disposal_class': disposal_class
-    }
+        outputs = model(image)
+
+    return postprocess(outputs, class_names=class_names, **thresholds)[0]
+
+def predict_regions(model, image, rois=None, tile_size=None, overlap=0.25, batch_size=16,
+                    class_names=None, **thresholds):
+    """
+    Runs the model on the regions of interest of a frame (optionally tiled into
+    overlapping patches) instead of the downscaled whole frame. Patch boxes are
+    mapped into frame pixel coordinates and merged with NMS across patches.
+    """
+    import torch
+    from preprocess import plan_regions, batch_patches, to_frame_coordinates
+    from postprocess import postprocess
+
+    regions = plan_regions(image.size, rois, tile_size, overlap)
+    batches = []
+    for start in range(0, len(regions), batch_size):
+        batch_regions = regions[start:start + batch_size]
+        with torch.no_grad():
+            outputs = model(batch_patches(image, batch_regions))
+        batches.append(outputs + (to_frame_coordinates(outputs[0], batch_regions),))
+    if not batches:
+        return []
+
+    person_bbox, person_logits, face_embedding, trash_logits, disposal_logits, frame_boxes = (
+        torch.cat(parts) for parts in zip(*batches)
+    )
+    outputs = (person_bbox, person_logits, face_embedding, trash_logits, disposal_logits)
+    return postprocess(outputs, boxes=frame_boxes, class_names=class_names, **thresholds)[0]
+
+def predict(image_path, model_path=DEFAULT_MODEL_PATH, num_trash_classes=60):
+    """
+    Performs inference on a single image. image_path may also be a file object.
+    """
+    from PIL import Image
+
+    model = get_model(model_path, num_trash_classes)
+    image = Image.open(image_path)
+    detections = predict_image(model, image, class_names=get_category_names(num_trash_classes))
+    return {'detections': detections}
 
 if __name__ == '__main__':
     image_path = 'c:\\Users\\KUNAL SHEDGE\\Desktop\\New folder\\trash_detect\\data\\unified_dataset\\images\\batch_1_000003.jpg'
@@ -19,6 +19,11 @@ def process_taco_dataset(data_dir, output_dir):
     # Create a mapping from category id to category name
     cat_id_to_name = {cat['id']: cat['name'] for cat in categories}
 
+    # Save the category table so that inference can map trash class ids to names
+    os.makedirs(output_dir, exist_ok=True)
+    with open(os.path.join(output_dir, 'categories.json'), 'w') as f:
+        json.dump(cat_id_to_name, f, indent=2)
+
     # Create directories for the unified dataset
     unified_images_dir = os.path.join(output_dir, 'images')
     unified_labels_dir = os.path.join(output_dir, 'labels')
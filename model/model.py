@@ -4,25 +4,39 @@ import torch
 import torch.nn as nn
 import torchvision.models as models
 
+# Backbones that can be assigned to a camera, with the size of their pooled
+# feature vector. resnet50 is the default; the lighter ones let a worker keep up
+# with more cameras on the same cores.
+BACKBONE_FEATURE_SIZES = {
+    'resnet50': 2048,
+    'resnet18': 512,
+    'mobilenet_v3_large': 960,
+}
+
+def build_backbone(name, pretrained):
+    """
+    Builds a feature extractor that maps an image batch to pooled features.
+    """
+    if name not in BACKBONE_FEATURE_SIZES:
+        raise ValueError(f"Unknown backbone: {name}")
+    network = getattr(models, name)(pretrained=pretrained)
+    if name.startswith('mobilenet'):
+        return nn.Sequential(network.features, network.avgpool)
+    # Remove the original classification head
+    return nn.Sequential(*(list(network.children())[:-1]))
+
 class TrashDetectionModel(nn.Module):
-    def __init__(self, num_trash_classes, pretrained=True):
+    def __init__(self, num_trash_classes, pretrained=True, backbone='resnet50'):
         super(TrashDetectionModel, self).__init__()
 
         # --- Feature Extractor ---
         # Use a pre-trained backbone (e.g., ResNet, MobileNet) for feature extraction.
         # This will be shared across all tasks.
-        if pretrained:
-            self.backbone = models.resnet50(pretrained=True)
-            # Remove the original classification head
-            self.backbone = nn.Sequential(*(list(self.backbone.children())[:-1]))
-        else:
-            self.backbone = models.resnet50(pretrained=False) # Or build from scratch
-            self.backbone = nn.Sequential(*(list(self.backbone.children())[:-1]))
-
-        # Get the output features size from the backbone
-        # A dummy forward pass might be needed to determine this dynamically
-        # For resnet50, it's typically 2048 after the avgpool layer
-        self.feature_size = 2048 # This might need to be adjusted based on the chosen backbone
+        self.backbone_name = backbone
+        self.backbone = build_backbone(backbone, pretrained)
+
+        # Output features size of the backbone after global pooling
+        self.feature_size = BACKBONE_FEATURE_SIZES[backbone]
 
         # --- Task-Specific Heads ---
 
@@ -0,0 +1,87 @@
+import os
+import json
+import torch
+from torchvision.ops import batched_nms
+
+# --- Batched Post-processing ---
+# Turns raw TrashDetectionModel outputs for a whole batch into compact result
+# records: softmax confidences, per-class thresholds and non-maximum
+# suppression are all done with tensor ops over the batch. Python only touches
+# the detections that survive, to build the returned dicts.
+
+# TACO category names, as written by merge_datasets.py into its output directory
+DEFAULT_CATEGORIES_PATH = os.environ.get('CATEGORIES_PATH', os.path.join('data', 'unified_dataset', 'categories.json'))
+
+def load_category_names(categories_file=DEFAULT_CATEGORIES_PATH, num_classes=60):
+    """
+    Loads the TACO category table written by merge_datasets.py as a list
+    indexed by trash class id. Unknown ids fall back to "class_<id>".
+    """
+    names = [f'class_{i}' for i in range(num_classes)]
+    if os.path.exists(categories_file):
+        with open(categories_file, 'r') as f:
+            for cat_id, name in json.load(f).items():
+                if int(cat_id) < num_classes:
+                    names[int(cat_id)] = name
+    return names
+
+def _class_thresholds(thresholds, num_classes, device):
+    # A single float applies to every class; a dict maps class id -> threshold
+    if isinstance(thresholds, dict):
+        table = torch.full((num_classes,), 0.5, device=device)
+        for class_id, value in thresholds.items():
+            table[class_id] = value
+        return table
+    return torch.full((num_classes,), float(thresholds), device=device)
+
+def postprocess(outputs, boxes=None, image_ids=None, class_names=None, person_threshold=0.5,
+                trash_thresholds=0.5, iou_threshold=0.5):
+    """
+    Post-processes a batch of model outputs.
+
+    outputs is the (person_bbox, person_logits, face_embedding, trash_logits,
+    disposal_logits) tuple for N samples. boxes overrides person_bbox (e.g. boxes
+    already mapped into frame coordinates) and image_ids gives the frame each
+    sample belongs to, so that NMS only suppresses boxes within the same frame.
+    Returns a list of result records per frame.
+    """
+    person_bbox, person_logits, face_embedding, trash_logits, disposal_logits = outputs
+    boxes = person_bbox if boxes is None else boxes
+    count = boxes.shape[0]
+    if image_ids is None:
+        image_ids = torch.zeros(count, dtype=torch.long, device=boxes.device)
+    num_images = int(image_ids.max().item()) + 1 if count else 0
+
+    # Softmax confidences
+    person_score = torch.softmax(person_logits, dim=1)[:, 1]
+    trash_score, trash_class = torch.softmax(trash_logits, dim=1).max(dim=1)
+    disposal_score, disposal_class = torch.softmax(disposal_logits, dim=1).max(dim=1)
+
+    # Per-class thresholds
+    thresholds = _class_thresholds(trash_thresholds, trash_logits.shape[1], trash_logits.device)
+    trash_ok = trash_score >= thresholds[trash_class]
+    person_ok = person_score >= person_threshold
+    keep = torch.nonzero(person_ok | trash_ok).squeeze(1)
+
+    # Non-maximum suppression per frame, ranked by the stronger of the two confidences
+    scores = torch.maximum(person_score * person_ok, trash_score * trash_ok)
+    keep = keep[batched_nms(boxes[keep].float(), scores[keep].float(), image_ids[keep], iou_threshold)]
+
+    results = [[] for _ in range(num_images)]
+    columns = zip(
+        image_ids[keep].tolist(), boxes[keep].tolist(), person_score[keep].tolist(),
+        trash_ok[keep].tolist(), trash_class[keep].tolist(), trash_score[keep].tolist(),
+        disposal_class[keep].tolist(), disposal_score[keep].tolist(), face_embedding[keep].tolist()
+    )
+    for image_id, box, p_score, t_ok, t_class, t_score, d_class, d_score, embedding in columns:
+        results[image_id].append({
+            'bbox': box,
+            'person_score': p_score,
+            'trash_class': t_class if t_ok else None,
+            'trash_name': (class_names[t_class] if class_names else None) if t_ok else None,
+            'trash_score': t_score,
+            'disposal_class': d_class,
+            'disposal_score': d_score,
+            'face_embedding': embedding
+        })
+    return results
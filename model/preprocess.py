@@ -0,0 +1,79 @@
+import torch
+from torchvision import transforms
+
+# --- Region-of-Interest Cropping and Tiling ---
+# Resizing a whole 1080p CCTV frame to 224x224 shrinks a bottle near a bin to a
+# few pixels and spends most of the compute on sky and road. Instead, the
+# configured bin regions are cropped out and, optionally, split into
+# overlapping tiles. Every patch is resized to the model input size and the
+# patches are run through the model as one batch. Boxes predicted for a patch
+# are then mapped back into frame coordinates.
+
+INPUT_SIZE = 224
+
+# Define transformations
+data_transform = transforms.Compose([
+    transforms.Resize((INPUT_SIZE, INPUT_SIZE)),
+    transforms.ToTensor(),
+    transforms.Normalize(mean=[0.485, 0.456, 0.406], std=[0.229, 0.224, 0.225])
+])
+
+def _tile_starts(length, tile, stride):
+    if length <= tile:
+        return [0]
+    starts = list(range(0, length - tile, stride))
+    starts.append(length - tile) # Last tile is flush with the edge
+    return starts
+
+def tile_region(region, tile_size, overlap=0.25):
+    """
+    Splits a region [x_min, y_min, x_max, y_max] into square tiles of tile_size
+    pixels that overlap by the given fraction, covering the whole region.
+    """
+    x_min, y_min, x_max, y_max = region
+    stride = max(1, int(tile_size * (1 - overlap)))
+    width, height = x_max - x_min, y_max - y_min
+    tile_width, tile_height = min(tile_size, width), min(tile_size, height)
+    return [
+        [x_min + x, y_min + y, x_min + x + tile_width, y_min + y + tile_height]
+        for y in _tile_starts(height, tile_height, stride)
+        for x in _tile_starts(width, tile_width, stride)
+    ]
+
+def plan_regions(image_size, rois=None, tile_size=None, overlap=0.25):
+    """
+    Returns the patch boxes, in frame pixel coordinates, to run the model on:
+    the configured regions of interest (or the whole frame), each optionally
+    tiled. ROIs are clipped to the frame.
+    """
+    width, height = image_size
+    regions = []
+    for x_min, y_min, x_max, y_max in (rois or [[0, 0, width, height]]):
+        region = [max(0, x_min), max(0, y_min), min(width, x_max), min(height, y_max)]
+        if region[2] <= region[0] or region[3] <= region[1]:
+            continue
+        if tile_size:
+            regions.extend(tile_region(region, tile_size, overlap))
+        else:
+            regions.append(region)
+    return regions
+
+def batch_patches(image, regions):
+    """
+    Crops each region out of a PIL image and stacks the transformed patches
+    into a single [N, 3, INPUT_SIZE, INPUT_SIZE] batch.
+    """
+    image = image.convert("RGB")
+    return torch.stack([data_transform(image.crop(tuple(region))) for region in regions])
+
+def to_frame_coordinates(boxes, regions):
+    """
+    Maps boxes predicted for each patch back into frame pixel coordinates.
+
+    boxes is an [N, 4] tensor of [x_min, y_min, x_max, y_max] relative to the
+    patch (0-1); regions holds the N patch boxes in frame pixels.
+    """
+    regions = torch.as_tensor(regions, dtype=boxes.dtype, device=boxes.device)
+    origin = regions[:, :2].repeat(1, 2)
+    size = (regions[:, 2:] - regions[:, :2]).repeat(1, 2)
+    return boxes * size + origin
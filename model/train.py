@@ -4,8 +4,9 @@ from torch.utils.data import DataLoader
 from torchvision import transforms
 from model import TrashDetectionModel
 from dataset import TrashDetectionDataset
+from inference import checkpoint_path
 
-def train_model(data_dir, num_epochs=10, batch_size=32, learning_rate=0.001, num_trash_classes=60):
+def train_model(data_dir, num_epochs=10, batch_size=32, learning_rate=0.001, num_trash_classes=60, backbone='resnet50'):
     """
     Trains the TrashDetectionModel.
     """
@@ -21,7 +22,7 @@ def train_model(data_dir, num_epochs=10, batch_size=32, learning_rate=0.001, num
     dataloader = DataLoader(dataset, batch_size=batch_size, shuffle=True)
 
     # Create model
-    model = TrashDetectionModel(num_trash_classes=num_trash_classes)
+    model = TrashDetectionModel(num_trash_classes=num_trash_classes, backbone=backbone)
 
     # Define loss functions and optimizer
     criterion_bbox = torch.nn.SmoothL1Loss()
@@ -48,8 +49,8 @@ def train_model(data_dir, num_epochs=10, batch_size=32, learning_rate=0.001, num
 
         print(f'Epoch [{epoch+1}/{num_epochs}], Loss: {loss.item():.4f}')
 
-    # Save the model
-    torch.save(model.state_dict(), 'trash_detection_model.pth')
+    # Save the model where inference and the workers look for this backbone
+    torch.save(model.state_dict(), checkpoint_path(backbone))
 
 if __name__ == '__main__':
     data_dir = 'c:\\Users\\KUNAL SHEDGE\\Desktop\\New folder\\trash_detect\\data\\unified_dataset'
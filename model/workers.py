@@ -0,0 +1,421 @@
+import os
+import sys
+import time
+import queue
+import threading
+import multiprocessing as mp
+
+# --- Sharded Inference Workers ---
+# Each worker process owns a subset of the cameras: it opens their streams,
+# samples frames at the camera's sample_fps, skips frames without motion and
+# runs the camera's backbone on its regions of interest. The supervisor assigns
+# cameras to workers, collects the measured rates and moves cameras off workers
+# that fall behind, so one box can serve from a few to hundreds of cameras
+# across its cores.
+
+STATS_INTERVAL = 2.0 # Seconds between worker stats reports
+ERROR_RETRY_INTERVAL = 30.0 # Seconds before retrying a camera whose model failed
+REOPEN_INTERVAL = 1.0 # Seconds between attempts to reopen a dropped stream
+MOTION_SIZE = (64, 36) # Frames are compared at this resolution for the motion gate
+
+class _StreamReader:
+    """
+    Reads one camera stream on its own thread. Frames are grabbed continuously,
+    so the capture buffer never fills up with old frames, but only decoded when
+    the worker has asked for one. Opening, reading and reopening the stream
+    block only this thread, never the other cameras on the worker.
+    """
+    def __init__(self, stream_url, cv2):
+        self.stream_url = stream_url
+        self.cv2 = cv2
+        self.connected = False
+        self._wanted = threading.Event()
+        self._frame = None
+        self._lock = threading.Lock()
+        self._stopped = False
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        capture = None
+        while not self._stopped:
+            if capture is None:
+                capture = self.cv2.VideoCapture(self.stream_url)
+                if not capture.isOpened():
+                    capture.release()
+                    capture = None
+                    time.sleep(REOPEN_INTERVAL)
+                    continue
+                self.connected = True
+            if not capture.grab():
+                # Stream dropped; reopen it
+                self.connected = False
+                capture.release()
+                capture = None
+                time.sleep(REOPEN_INTERVAL)
+                continue
+            if self._wanted.is_set():
+                ok, frame = capture.retrieve()
+                if ok:
+                    with self._lock:
+                        self._frame = frame
+                    self._wanted.clear()
+        self.connected = False
+        if capture is not None:
+            capture.release()
+
+    def request(self):
+        # The next grabbed frame, i.e. the newest one, will be decoded
+        with self._lock:
+            self._frame = None
+        self._wanted.set()
+
+    def take(self):
+        """
+        Returns the frame decoded since the last request(), or None if it has
+        not arrived yet.
+        """
+        with self._lock:
+            frame, self._frame = self._frame, None
+        return frame
+
+    def stop(self):
+        # Not joined: the thread may be blocked inside a stalled read
+        self._stopped = True
+
+class _CameraState:
+    def __init__(self, config, reader):
+        self.config = config
+        self.reader = reader
+        self.requested = False # A frame has been asked for and not yet taken
+        self.next_due = time.monotonic()
+        self.previous = None
+        self.sampled = 0
+        self.inferred = 0
+        self.missed = 0
+
+def _has_motion(state, frame, cv2, np):
+    gray = cv2.resize(cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY), MOTION_SIZE).astype(np.int16)
+    previous, state.previous = state.previous, gray
+    if previous is None:
+        return True
+    return np.abs(gray - previous).mean() / 255.0 >= state.config['motion_threshold']
+
+def worker_main(worker_id, commands, results, num_trash_classes=60):
+    """
+    Worker process loop. Receives ('assign', config), ('release', location) and
+    ('stop', None) commands, and reports ('detection', ...), ('error', ...) and
+    ('stats', ...) messages on the results queue.
+    """
+    import cv2
+    import numpy as np
+    from PIL import Image
+    from inference import load_model, checkpoint_path, predict_regions, get_category_names
+
+    models = {} # Backbone name -> loaded model, shared by the cameras using it
+    class_names = get_category_names(num_trash_classes)
+    cameras = {}
+    busy = 0.0
+    window_start = time.monotonic()
+    running = True
+
+    while running:
+        # Apply supervisor commands
+        while True:
+            try:
+                command, payload = commands.get_nowait()
+            except queue.Empty:
+                break
+            if command == 'assign':
+                previous = cameras.get(payload['location'])
+                if previous:
+                    previous.reader.stop()
+                cameras[payload['location']] = _CameraState(payload, _StreamReader(payload['stream_url'], cv2))
+            elif command == 'release':
+                state = cameras.pop(payload, None)
+                if state:
+                    state.reader.stop()
+            elif command == 'stop':
+                running = False
+
+        now = time.monotonic()
+        for location, state in cameras.items():
+            if not state.requested:
+                if now < state.next_due:
+                    continue
+                interval = 1.0 / state.config['sample_fps']
+                state.next_due += interval
+                if state.next_due < now:
+                    # Fell behind: count the skipped samples and resynchronise
+                    state.missed += int((now - state.next_due) / interval) + 1
+                    state.next_due = now + interval
+                if not state.reader.connected:
+                    continue # The reader thread is (re)opening the stream
+                state.reader.request()
+                state.requested = True
+
+            frame = state.reader.take()
+            if frame is None:
+                continue # Arrives with the stream's next frame
+            state.requested = False
+            state.sampled += 1
+            if not _has_motion(state, frame, cv2, np):
+                continue
+
+            backbone = state.config['backbone']
+            started = time.monotonic()
+            try:
+                if backbone not in models:
+                    models[backbone] = load_model(checkpoint_path(backbone), num_trash_classes, backbone)
+                prediction = predict_regions(
+                    models[backbone], Image.fromarray(frame[:, :, ::-1]),
+                    rois=state.config['rois'], tile_size=state.config['tile_size'], class_names=class_names
+                )
+            except Exception as e:
+                # A missing checkpoint or bad frame must not take down the other cameras on this worker
+                results.put(('error', location, f'{type(e).__name__}: {e}', time.time()))
+                state.next_due = time.monotonic() + ERROR_RETRY_INTERVAL
+                continue
+            busy += time.monotonic() - started
+            state.inferred += 1
+            results.put(('detection', location, prediction, time.time()))
+
+        now = time.monotonic()
+        elapsed = now - window_start
+        if elapsed >= STATS_INTERVAL:
+            inferred = sum(state.inferred for state in cameras.values())
+            results.put(('stats', worker_id, {
+                'busy': busy / elapsed,
+                'seconds_per_frame': busy / inferred if inferred else None,
+                'cameras': {
+                    location: {
+                        'sampled_fps': state.sampled / elapsed,
+                        'inferred_fps': state.inferred / elapsed,
+                        'missed': state.missed,
+                        'connected': state.reader.connected,
+                    }
+                    for location, state in cameras.items()
+                },
+            }))
+            for state in cameras.values():
+                state.sampled = state.inferred = state.missed = 0
+            busy = 0.0
+            window_start = now
+
+        if any(state.requested for state in cameras.values()):
+            time.sleep(0.005) # A requested frame is at most one stream frame away
+        elif cameras:
+            wait = min(state.next_due for state in cameras.values()) - time.monotonic()
+            if wait > 0:
+                time.sleep(min(wait, 0.05))
+        else:
+            time.sleep(0.05)
+
+    for state in cameras.values():
+        state.reader.stop()
+
+# --- Load Balancing ---
+
+def camera_cost(config, camera_stats=None):
+    """
+    Expected model invocations per second for a camera: its sample rate scaled
+    by the measured fraction of sampled frames that passed the motion gate.
+    """
+    if camera_stats and camera_stats['sampled_fps'] > 0:
+        return config['sample_fps'] * camera_stats['inferred_fps'] / camera_stats['sampled_fps']
+    return config['sample_fps']
+
+def plan_assignments(cameras, worker_ids):
+    """
+    Initial placement: longest-processing-time-first greedy packing of cameras
+    onto the least loaded worker.
+    """
+    loads = {worker_id: 0.0 for worker_id in worker_ids}
+    assignments = {}
+    for config in sorted(cameras, key=camera_cost, reverse=True):
+        worker_id = min(loads, key=loads.get)
+        assignments[config['location']] = worker_id
+        loads[worker_id] += camera_cost(config)
+    return assignments
+
+def plan_moves(assignments, cameras, worker_stats, lag_tolerance=0.8):
+    """
+    Returns (location, from_worker, to_worker) moves that take load off workers
+    whose cameras are sampled at less than lag_tolerance of their target rate.
+
+    A worker's capacity is 1 / measured seconds per inference; workers that
+    have not run the model yet are assumed to match the average measured one.
+    """
+    measured = [stats['seconds_per_frame'] for stats in worker_stats.values() if stats.get('seconds_per_frame')]
+    if not measured:
+        return []
+    default_capacity = len(measured) / sum(measured)
+
+    capacity = {}
+    for worker_id in set(assignments.values()) | set(worker_stats):
+        seconds = worker_stats.get(worker_id, {}).get('seconds_per_frame')
+        capacity[worker_id] = 1.0 / seconds if seconds else default_capacity
+
+    def stats_for(location):
+        worker_id = assignments[location]
+        return worker_stats.get(worker_id, {}).get('cameras', {}).get(location)
+
+    costs = {location: camera_cost(cameras[location], stats_for(location)) for location in assignments}
+    loads = {worker_id: 0.0 for worker_id in capacity}
+    lagging = set()
+    for location, worker_id in assignments.items():
+        loads[worker_id] += costs[location]
+        camera_stats = stats_for(location)
+        # A disconnected stream samples nothing, but moving it would not help
+        if camera_stats and camera_stats.get('connected', True) and \
+                camera_stats['sampled_fps'] < lag_tolerance * cameras[location]['sample_fps']:
+            lagging.add(worker_id)
+
+    moves = []
+    for worker_id in sorted(lagging, key=lambda w: loads[w] / capacity[w], reverse=True):
+        candidates = sorted(
+            (location for location, owner in assignments.items() if owner == worker_id),
+            key=costs.get, reverse=True
+        )
+        for location in candidates:
+            if loads[worker_id] <= capacity[worker_id] * lag_tolerance:
+                break
+            targets = [w for w in capacity if w not in lagging]
+            if not targets:
+                break
+            target = max(targets, key=lambda w: capacity[w] * lag_tolerance - loads[w])
+            if loads[target] + costs[location] > capacity[target] * lag_tolerance:
+                continue # Too big for the emptiest worker; try a smaller camera
+            moves.append((location, worker_id, target))
+            loads[worker_id] -= costs[location]
+            loads[target] += costs[location]
+    return moves
+
+class WorkerSupervisor:
+    """
+    Starts a pool of inference worker processes, shards cameras across them and
+    periodically rebalances based on the rates the workers report.
+    """
+    def __init__(self, cameras, num_workers=None, num_trash_classes=60, lag_tolerance=0.8,
+                 rebalance_interval=30.0, on_detection=None):
+        self.cameras = {config['location']: config for config in cameras}
+        self.num_workers = num_workers or os.cpu_count() or 1
+        self.num_trash_classes = num_trash_classes
+        self.lag_tolerance = lag_tolerance
+        self.rebalance_interval = rebalance_interval
+        self.on_detection = on_detection
+        self.assignments = {} # Camera location -> worker id
+        self.worker_stats = {} # Worker id -> last stats report
+        self.camera_errors = {} # Camera location -> last error reported by its worker
+        self.processes = []
+        self.commands = []
+
+    def start(self):
+        # Spawn rather than fork so that workers do not inherit torch/OpenCV thread state
+        self.context = mp.get_context('spawn')
+        self.results = self.context.Queue()
+        for worker_id in range(self.num_workers):
+            self._start_worker(worker_id)
+        for location, worker_id in plan_assignments(self.cameras.values(), range(self.num_workers)).items():
+            self._assign(location, worker_id)
+
+    def _start_worker(self, worker_id):
+        commands = self.context.Queue()
+        process = self.context.Process(
+            target=worker_main,
+            args=(worker_id, commands, self.results, self.num_trash_classes),
+            daemon=True
+        )
+        process.start()
+        if worker_id < len(self.processes):
+            self.commands[worker_id] = commands
+            self.processes[worker_id] = process
+        else:
+            self.commands.append(commands)
+            self.processes.append(process)
+
+    def check_workers(self):
+        """
+        Restarts worker processes that have died and hands their cameras to the
+        replacement. A dead worker sends no stats, so rebalancing alone would
+        never notice it. Returns the restarted worker ids.
+        """
+        restarted = []
+        for worker_id, process in enumerate(self.processes):
+            if process.is_alive():
+                continue
+            print(f"Worker {worker_id} exited with code {process.exitcode}; restarting it")
+            self._start_worker(worker_id)
+            self.worker_stats.pop(worker_id, None)
+            for location, owner in self.assignments.items():
+                if owner == worker_id:
+                    self._assign(location, worker_id)
+            restarted.append(worker_id)
+        return restarted
+
+    def _assign(self, location, worker_id):
+        self.assignments[location] = worker_id
+        self.commands[worker_id].put(('assign', self.cameras[location]))
+
+    def move(self, location, worker_id):
+        self.commands[self.assignments[location]].put(('release', location))
+        self._assign(location, worker_id)
+
+    def rebalance(self):
+        moves = plan_moves(self.assignments, self.cameras, self.worker_stats, self.lag_tolerance)
+        for location, old_worker, new_worker in moves:
+            print(f"Moving camera {location} from worker {old_worker} to worker {new_worker}")
+            self.move(location, new_worker)
+        # Stats describe the old placement; wait for fresh reports before moving again
+        self.worker_stats.clear()
+        return moves
+
+    def poll(self, timeout=1.0):
+        try:
+            message = self.results.get(timeout=timeout)
+        except queue.Empty:
+            return
+        if message[0] == 'stats':
+            _, worker_id, stats = message
+            self.worker_stats[worker_id] = stats
+        elif message[0] == 'detection' and self.on_detection:
+            _, location, prediction, timestamp = message
+            self.on_detection(location, prediction, timestamp)
+        elif message[0] == 'error':
+            _, location, error, timestamp = message
+            self.camera_errors[location] = error
+            print(f"Camera {location}: {error}")
+
+    def run_forever(self):
+        last_rebalance = time.monotonic()
+        while True:
+            self.poll()
+            self.check_workers()
+            if time.monotonic() - last_rebalance >= self.rebalance_interval:
+                self.rebalance()
+                last_rebalance = time.monotonic()
+
+    def stop(self):
+        for commands in self.commands:
+            commands.put(('stop', None))
+        for process in self.processes:
+            process.join(timeout=5)
+
+if __name__ == '__main__':
+    # Add project root to the Python path
+    sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+    from trash_detect.database import SessionLocal, Camera
+
+    db_session = SessionLocal()
+    cameras = [camera.to_config() for camera in db_session.query(Camera).filter_by(is_active=True).all()]
+    db_session.close()
+
+    supervisor = WorkerSupervisor(
+        cameras,
+        on_detection=lambda location, prediction, timestamp: print(location, [d['disposal_class'] for d in prediction])
+    )
+    supervisor.start()
+    try:
+        supervisor.run_forever()
+    except KeyboardInterrupt:
+        supervisor.stop()
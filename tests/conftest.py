@@ -0,0 +1,36 @@
+import os
+import sys
+import tempfile
+import importlib.util
+
+import pytest
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+MODEL_DIR = os.path.join(ROOT_DIR, 'model')
+
+# Point the database at a scratch file before anything imports database.py
+os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(tempfile.mkdtemp(prefix='trash_detect_tests_'), 'test.db')
+
+# The apps import the project as the "trash_detect" package; register the
+# checkout under that name whatever its directory is called.
+if 'trash_detect' not in sys.modules:
+    spec = importlib.util.spec_from_file_location(
+        'trash_detect', os.path.join(ROOT_DIR, '__init__.py'), submodule_search_locations=[ROOT_DIR]
+    )
+    package = importlib.util.module_from_spec(spec)
+    sys.modules['trash_detect'] = package
+    spec.loader.exec_module(package)
+
+# The model modules import each other by file name
+sys.path.insert(0, MODEL_DIR)
+
+@pytest.fixture
+def db():
+    """
+    Fresh, empty tables for each test.
+    """
+    from trash_detect.database import Base, engine
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    yield engine
+    Base.metadata.drop_all(engine)
@@ -0,0 +1,86 @@
+import io
+
+import pytest
+
+from trash_detect.database import User, DisposalRecord, Camera, SessionLocal
+
+
+@pytest.fixture
+def client(db):
+    from trash_detect.app.app import app
+    session = SessionLocal()
+    session.add(User(id=1, name='A', surname='X', aadhar_id='1', face_id='face_1'))
+    session.commit()
+    session.close()
+    app.config['TESTING'] = True
+    with app.test_client() as client:
+        with client.session_transaction() as flask_session:
+            flask_session['user_id'] = 1
+        yield client
+
+
+@pytest.fixture
+def cameras(db):
+    session = SessionLocal()
+    session.add_all([
+        Camera(location='CCTV_1', stream_url='rtsp://cctv-1'),
+        Camera(location='CCTV_2', stream_url='rtsp://cctv-2', is_active=False),
+    ])
+    session.commit()
+    session.close()
+
+
+@pytest.fixture
+def admin_client(db):
+    from trash_detect.admin.admin import admin_app
+    admin_app.config['TESTING'] = True
+    client = admin_app.test_client() # Not a context manager, so it can be used alongside client
+    with client.session_transaction() as flask_session:
+        flask_session['admin_logged_in'] = True
+    return client
+
+
+def _upload(client, location):
+    return client.post('/upload_footage', data={
+        'footage': (io.BytesIO(b'clip'), 'clip.mp4'), 'cctv_location': location
+    }, content_type='multipart/form-data')
+
+
+def _records():
+    session = SessionLocal()
+    records = [(record.user_id, record.cctv_location) for record in session.query(DisposalRecord).all()]
+    points = session.query(User).filter_by(id=1).first().points
+    session.close()
+    return records, points
+
+
+def test_upload_footage_records_registered_camera(client, cameras):
+    _upload(client, 'CCTV_1')
+    assert _records() == ([(1, 'CCTV_1')], 10)
+
+
+@pytest.mark.parametrize('location', ['CCTV_999', 'CCTV_2'])
+def test_upload_footage_rejects_unknown_or_inactive_camera(client, cameras, location):
+    _upload(client, location)
+    assert _records() == ([], 0)
+
+
+def test_upload_footage_accepts_any_location_without_registry(client):
+    _upload(client, 'CCTV_7')
+    assert _records() == ([(1, 'CCTV_7')], 10)
+
+
+def test_admin_registers_and_deactivates_cameras(admin_client, client):
+    admin_client.post('/admin/cameras', data={'location': 'CCTV_1', 'stream_url': 'rtsp://cctv-1'})
+    admin_client.post('/admin/cameras', data={'location': 'CCTV_1', 'stream_url': 'rtsp://other'})
+    session = SessionLocal()
+    registered = [(camera.id, camera.stream_url) for camera in session.query(Camera).all()]
+    session.close()
+    assert [url for _, url in registered] == ['rtsp://cctv-1']
+    assert b'CCTV_1' in admin_client.get('/admin/cameras').data
+
+    _upload(client, 'CCTV_7')
+    assert _records() == ([], 0)
+    admin_client.post(f'/admin/camera/{registered[0][0]}/toggle')
+    _upload(client, 'CCTV_1')
+    assert _records() == ([], 0)
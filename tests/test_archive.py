@@ -0,0 +1,188 @@
+import os
+import datetime
+
+import pytest
+
+pytest.importorskip('pyarrow')
+
+from sqlalchemy import select
+
+from trash_detect import archive
+from trash_detect.database import DisposalRecord, ArchivedUserMonth, SessionLocal, engine
+
+NOW = datetime.datetime(2025, 6, 15, 12, 0)
+
+
+def _record(record_id, user_id, days_ago, location='CCTV_1'):
+    return DisposalRecord(
+        id=record_id, user_id=user_id, cctv_location=location, timestamp=NOW - datetime.timedelta(days=days_ago),
+        trash_type='plastic', disposed_properly=True, points_awarded=10, footage_url=f'clip_{record_id}.mp4'
+    )
+
+
+@pytest.fixture
+def records(db):
+    # User 1 has two live and four old records across two months and cameras; user 2 has two old ones
+    session = SessionLocal()
+    session.add_all([
+        _record(1, 1, 150), _record(2, 1, 140, 'CCTV_2'), _record(3, 1, 120), _record(4, 1, 100),
+        _record(5, 2, 130), _record(6, 2, 110, 'CCTV_2'),
+        _record(7, 1, 10), _record(8, 1, 5),
+    ])
+    session.commit()
+    session.close()
+
+
+@pytest.fixture
+def archive_dir(tmp_path):
+    return str(tmp_path / 'archive')
+
+
+def _ids(table):
+    return sorted(table.column('id').to_pylist())
+
+
+def _files(archive_dir):
+    return sorted(
+        os.path.relpath(os.path.join(root, name), archive_dir)
+        for root, _, names in os.walk(archive_dir) for name in names
+    )
+
+
+def _history(user_id, limit=None, archive_dir=None):
+    session = SessionLocal()
+    history = archive.user_disposal_history(session, user_id, limit=limit, archive_dir=archive_dir)
+    session.close()
+    return [record.id for record in history]
+
+
+def test_archive_moves_old_records_and_round_trips(records, archive_dir):
+    moved = archive.archive_disposal_records(NOW - datetime.timedelta(days=90), archive_dir, chunk_size=4)
+    assert moved == 6
+    with engine.connect() as conn:
+        assert conn.execute(select(DisposalRecord.id).order_by(DisposalRecord.id)).scalars().all() == [7, 8]
+
+    archived = archive.query_archive(archive_dir=archive_dir)
+    assert _ids(archived) == [1, 2, 3, 4, 5, 6]
+    row = [row for row in archived.to_pylist() if row['id'] == 2][0]
+    assert row['cctv_location'] == 'CCTV_2'
+    assert row['timestamp'] == NOW - datetime.timedelta(days=140)
+    assert row['footage_url'] == 'clip_2.mp4'
+
+
+def test_query_archive_filters_and_selects_columns(records, archive_dir):
+    archive.archive_disposal_records(NOW - datetime.timedelta(days=90), archive_dir)
+    archived = archive.query_archive(columns=['user_id', 'cctv_location'], user_id=2, archive_dir=archive_dir)
+    assert archived.column_names == ['user_id', 'cctv_location']
+    assert sorted(archived.column('cctv_location').to_pylist()) == ['CCTV_1', 'CCTV_2']
+
+    archived = archive.query_archive(cctv_locations=['CCTV_2'], start=NOW - datetime.timedelta(days=145),
+                                     archive_dir=archive_dir)
+    assert _ids(archived) == [2, 6]
+    assert archive.query_archive(archive_dir=archive_dir + '_missing') is None
+
+
+def test_chunk_written_twice_is_read_once(records, archive_dir):
+    table = DisposalRecord.__table__
+    with engine.connect() as conn:
+        rows = conn.execute(select(*[table.c[name] for name in archive.COLUMNS]).where(table.c.id <= 6)).all()
+    pa = archive._pyarrow()
+    archive._write_chunk(pa, rows, archive_dir)
+    archive._write_chunk(pa, rows, archive_dir) # As after a crash between writing and deleting
+
+    assert _ids(archive.query_archive(archive_dir=archive_dir)) == [1, 2, 3, 4, 5, 6]
+    assert archive.query_archive(columns=['user_id'], archive_dir=archive_dir).num_rows == 6
+    assert _history(1, archive_dir=archive_dir) == [8, 7, 4, 3, 2, 1]
+
+    assert archive.compact_archive(archive_dir) == 5
+    assert len(_files(archive_dir)) == 5
+    assert _ids(archive.query_archive(archive_dir=archive_dir)) == [1, 2, 3, 4, 5, 6]
+
+
+def test_archive_leaves_one_sorted_file_per_partition(records, archive_dir):
+    archive.archive_disposal_records(NOW - datetime.timedelta(days=90), archive_dir, chunk_size=1)
+    files = _files(archive_dir)
+    assert [os.path.dirname(path) for path in files] == [
+        os.path.join('month=2025-01', 'cctv_location=CCTV_1'),
+        os.path.join('month=2025-01', 'cctv_location=CCTV_2'),
+        os.path.join('month=2025-02', 'cctv_location=CCTV_1'),
+        os.path.join('month=2025-02', 'cctv_location=CCTV_2'),
+        os.path.join('month=2025-03', 'cctv_location=CCTV_1'),
+    ]
+    pq = pytest.importorskip('pyarrow.parquet')
+    february = pq.read_table(os.path.join(archive_dir, files[2]))
+    assert february.column('user_id').to_pylist() == [1, 2]
+
+
+def test_archive_indexes_months_per_user(records, archive_dir):
+    archive.archive_disposal_records(NOW - datetime.timedelta(days=90), archive_dir, chunk_size=4)
+    archive.archive_disposal_records(NOW - datetime.timedelta(days=90), archive_dir) # Nothing left to move
+    session = SessionLocal()
+    index = {(row.user_id, row.month) for row in session.query(ArchivedUserMonth).all()}
+    session.close()
+    assert index == {(1, '2025-01'), (1, '2025-02'), (1, '2025-03'), (2, '2025-02')}
+
+
+def test_user_history_reads_only_the_months_it_needs(records, archive_dir, monkeypatch):
+    archive.archive_disposal_records(NOW - datetime.timedelta(days=90), archive_dir)
+    query_archive = archive.query_archive
+    months_read = []
+
+    def recording_query_archive(**kwargs):
+        months_read.append(kwargs['months'])
+        return query_archive(**kwargs)
+    monkeypatch.setattr(archive, 'query_archive', recording_query_archive)
+
+    assert _history(1, limit=3, archive_dir=archive_dir) == [8, 7, 4]
+    assert months_read == [['2025-03']]
+    assert _history(3, archive_dir=archive_dir) == []
+    assert months_read == [['2025-03']]
+
+
+def test_user_history_spans_live_table_and_archive(records, archive_dir):
+    archive.archive_disposal_records(NOW - datetime.timedelta(days=90), archive_dir)
+    assert _history(1, archive_dir=archive_dir) == [8, 7, 4, 3, 2, 1]
+    assert _history(1, limit=3, archive_dir=archive_dir) == [8, 7, 4]
+    assert _history(1, limit=2, archive_dir=archive_dir) == [8, 7]
+    assert _history(2, archive_dir=archive_dir) == [6, 5]
+
+
+def test_archive_writes_chunks_spanning_many_partitions(db, archive_dir):
+    # More month x camera pairs in one chunk than pyarrow's default partition limit
+    session = SessionLocal()
+    session.add_all([
+        _record(record_id, 1, 100 + record_id % 3 * 31, f'CCTV_{record_id % 400}') for record_id in range(1, 1501)
+    ])
+    session.commit()
+    session.close()
+    assert archive.archive_disposal_records(NOW - datetime.timedelta(days=90), archive_dir) == 1500
+    assert len(_files(archive_dir)) == 1200
+    assert archive.query_archive(columns=['id'], archive_dir=archive_dir).num_rows == 1500
+
+
+def test_query_by_month_lists_only_that_month(records, archive_dir):
+    archive.archive_disposal_records(NOW - datetime.timedelta(days=90), archive_dir)
+    other_month = os.path.join(archive_dir, 'month=2024-01', 'cctv_location=CCTV_1')
+    os.makedirs(other_month)
+    with open(os.path.join(other_month, 'part-broken.parquet'), 'wb') as f:
+        f.write(b'not parquet') # Reading the whole archive would fail on this file
+
+    assert _ids(archive.query_archive(months=['2025-02'], archive_dir=archive_dir)) == [3, 5, 6]
+    assert archive.query_archive(months=['2023-01'], archive_dir=archive_dir).num_rows == 0
+
+
+def test_query_lists_again_when_compaction_removed_a_file(records, archive_dir, monkeypatch):
+    archive.archive_disposal_records(NOW - datetime.timedelta(days=90), archive_dir)
+    month_files = archive._month_files
+    listings = []
+
+    def racing_month_files(archive_dir, months):
+        files = month_files(archive_dir, months)
+        listings.append(files)
+        if len(listings) == 1:
+            files = files + [os.path.join(archive_dir, 'month=2025-02', 'cctv_location=CCTV_1', 'part-gone.parquet')]
+        return files
+    monkeypatch.setattr(archive, '_month_files', racing_month_files)
+
+    assert _ids(archive.query_archive(months=['2025-02'], archive_dir=archive_dir)) == [3, 5, 6]
+    assert len(listings) == 2
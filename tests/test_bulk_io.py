@@ -0,0 +1,111 @@
+import io
+import json
+
+from trash_detect.database import User, DisposalRecord, SessionLocal
+from trash_detect.bulk_io import import_users, import_disposal_records, export_rows
+
+
+def _jsonl(*rows):
+    return io.BytesIO(''.join((row if isinstance(row, str) else json.dumps(row)) + '\n' for row in rows).encode())
+
+
+def _users():
+    session = SessionLocal()
+    users = {user.aadhar_id: user for user in session.query(User).all()}
+    session.close()
+    return users
+
+
+def test_import_users_csv_dedups_within_file_and_against_database(db):
+    report = import_users(io.BytesIO(b"name,surname,aadhar_id\nA,X,1\nB,Y,2\nC,Z,1\n"))
+    assert (report.inserted, report.duplicates, report.error_count) == (2, 1, 0)
+
+    report = import_users(io.BytesIO(b"name,surname,aadhar_id\nA,X,1\nD,W,3\n"), chunk_size=1)
+    assert (report.inserted, report.duplicates, report.error_count) == (1, 1, 0)
+    assert sorted(_users()) == ['1', '2', '3']
+    assert _users()['1'].face_id == 'face_1'
+
+
+def test_import_users_reports_bad_rows_without_aborting(db):
+    report = import_users(_jsonl(
+        {'name': 'A', 'aadhar_id': '1'},
+        {'surname': 'missing name', 'aadhar_id': '2'},
+        '{not json',
+        {'name': 'B', 'aadhar_id': '3', 'points': 'many'},
+        {'name': 'C', 'aadhar_id': '4'},
+    ), fmt='json')
+    assert report.inserted == 2
+    assert [row_number for row_number, _ in report.errors] == [2, 3, 4]
+
+
+def test_import_users_coerces_non_string_json_values(db):
+    report = import_users(_jsonl(
+        {'name': 123, 'aadhar_id': 1},
+        {'name': 'A', 'surname': 5, 'aadhar_id': '2'},
+    ), fmt='json')
+    assert (report.inserted, report.error_count) == (2, 0)
+    users = _users()
+    assert users['1'].name == '123'
+    assert users['2'].surname == '5'
+
+
+def test_import_users_rejects_rows_that_are_not_objects(db):
+    report = import_users(_jsonl([1, 2], '"text"', {'name': 'A', 'aadhar_id': '1'}), fmt='json')
+    assert report.inserted == 1
+    assert report.errors == [(1, 'row is not an object'), (2, 'row is not an object')]
+
+
+def test_import_users_reports_taken_face_id(db):
+    import_users(io.BytesIO(b"name,aadhar_id,face_id\nA,1,f1\n"))
+    report = import_users(io.BytesIO(b"name,aadhar_id,face_id\nB,2,f1\nC,3,f3\n"))
+    assert report.inserted == 1
+    assert report.errors == [(2, 'face_id f1 is already registered')]
+
+
+def test_import_disposal_records_rejects_unknown_users(db):
+    import_users(io.BytesIO(b"name,aadhar_id\nA,1\n"))
+    user_id = _users()['1'].id
+    report = import_disposal_records(io.BytesIO(
+        f"user_id,cctv_location,disposed_properly,points_awarded\n"
+        f"{user_id},CCTV_2,true,10\n{user_id + 100},CCTV_2,true,10\n{user_id},CCTV_2,maybe,10\n".encode()
+    ))
+    assert report.inserted == 1
+    assert sorted(row_number for row_number, _ in report.errors) == [3, 4]
+
+
+def test_export_round_trips_through_import(db):
+    import_users(io.BytesIO(b"name,surname,aadhar_id\nA,X,1\nB,Y,2\n"))
+    exported = ''.join(export_rows(User, 'json', chunk_size=1))
+    rows = [json.loads(line) for line in exported.splitlines()]
+    assert [row['aadhar_id'] for row in rows] == ['1', '2']
+
+    csv_export = ''.join(export_rows(DisposalRecord, 'csv'))
+    assert csv_export.splitlines()[0].startswith('id,user_id,cctv_location')
+
+
+def test_import_users_reports_undecodable_and_unreadable_csv_rows(db):
+    csv_bytes = (
+        b"name,surname,aadhar_id\n"
+        b"A,X,1\n"
+        b"B\xff\xfe,Y,2\n"
+        b"C,\x00,3\n"
+        b"\"" + b"D" * 200000 + b"\",Z,4\n"
+        b"E,W,5\n"
+    )
+    report = import_users(io.BytesIO(csv_bytes), chunk_size=2)
+    assert report.inserted == 2
+    assert [row_number for row_number, _ in report.errors] == [3, 4, 5]
+    assert 'unreadable CSV row' in report.errors[2][1]
+    assert sorted(_users()) == ['1', '5']
+
+
+def test_admin_bulk_import_returns_report_for_bad_bytes(db):
+    from trash_detect.admin.admin import admin_app
+    client = admin_app.test_client()
+    with client.session_transaction() as flask_session:
+        flask_session['admin_logged_in'] = True
+    response = client.post('/admin/bulk', data={
+        'kind': 'users', 'file': (io.BytesIO(b"name,surname,aadhar_id\nA,X,1\n\xff,Y,2\n"), 'users.csv')
+    }, content_type='multipart/form-data')
+    assert response.status_code == 200
+    assert b'Imported 1 rows' in response.data
@@ -0,0 +1,97 @@
+import io
+import os
+
+import pytest
+
+from cache import PredictionCache, model_version
+
+
+def _cached(cache, data, version='v1'):
+    result, key = cache.get(data, version)
+    if result is None:
+        cache.put(key, {'data': data.decode()})
+    return result
+
+
+def test_lru_evicts_least_recently_used_entry():
+    cache = PredictionCache(max_entries=2)
+    _cached(cache, b'a')
+    _cached(cache, b'b')
+    _cached(cache, b'a') # Refreshes a, so b is the oldest
+    _cached(cache, b'c')
+    assert _cached(cache, b'a') == {'data': 'a'}
+    assert _cached(cache, b'b') is None
+    assert cache.stats()['entries'] == 2
+
+
+def test_lru_is_bounded_by_bytes():
+    cache = PredictionCache(max_bytes=30) # Each result is ~13 bytes of JSON
+    for data in (b'a', b'b', b'c'):
+        _cached(cache, data)
+    stats = cache.stats()
+    assert stats['entries'] == 2
+    assert stats['bytes'] <= 30
+    assert _cached(cache, b'a') is None
+
+
+def test_new_model_version_invalidates_memory_and_disk(tmp_path):
+    cache = PredictionCache(disk_dir=str(tmp_path))
+    _cached(cache, b'a', 'v1')
+    assert _cached(cache, b'a', 'v1') == {'data': 'a'}
+    assert _cached(cache, b'a', 'v2') is None
+    assert [name.split('-')[0] for name in os.listdir(tmp_path)] == ['v2']
+
+
+def test_disk_tier_survives_restart_and_drops_other_versions(tmp_path):
+    _cached(PredictionCache(disk_dir=str(tmp_path)), b'a', 'v1')
+
+    cache = PredictionCache(disk_dir=str(tmp_path))
+    assert _cached(cache, b'a', 'v1') == {'data': 'a'}
+    assert cache.stats()['disk_hits'] == 1
+
+    assert _cached(PredictionCache(disk_dir=str(tmp_path)), b'b', 'v2') is None
+    assert all(name.startswith('v2-') for name in os.listdir(tmp_path))
+
+
+def test_result_for_stale_version_is_not_stored():
+    cache = PredictionCache()
+    _, key = cache.get(b'a', 'v1')
+    cache.get(b'b', 'v2') # Checkpoint replaced while a was being predicted
+    cache.put(key, {'data': 'a'})
+    assert cache.stats()['entries'] == 0
+
+
+def _png(shift):
+    Image = pytest.importorskip('PIL.Image')
+    image = Image.new('L', (90, 80))
+    image.putdata([min(255, x * 3 + shift) for y in range(80) for x in range(90)])
+    buffer = io.BytesIO()
+    image.save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+def test_near_duplicate_images_share_a_result_when_enabled():
+    cache = PredictionCache(max_distance=4)
+    result, key = cache.get(_png(0), 'v1')
+    cache.put(key, {'frame': 0})
+    assert cache.get(_png(2), 'v1')[0] == {'frame': 0}
+    stats = cache.stats()
+    assert (stats['misses'], stats['near_duplicate_hits'], stats['hit_rate']) == (1, 1, 0.5)
+
+
+def test_near_duplicate_matching_is_off_by_default():
+    cache = PredictionCache()
+    result, key = cache.get(_png(0), 'v1')
+    assert key.perceptual_hash is None
+    cache.put(key, {'frame': 0})
+    assert cache.get(_png(2), 'v1')[0] is None
+    assert cache.get(_png(0), 'v1')[0] == {'frame': 0}
+
+
+def test_model_version_tracks_checkpoint_file(tmp_path):
+    checkpoint = tmp_path / 'model.pth'
+    assert model_version(str(checkpoint)) == 'missing'
+    checkpoint.write_bytes(b'weights')
+    first = model_version(str(checkpoint))
+    os.utime(checkpoint, ns=(0, 1))
+    assert model_version(str(checkpoint)) != first
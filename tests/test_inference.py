@@ -0,0 +1,66 @@
+import pytest
+
+torch = pytest.importorskip('torch')
+pytest.importorskip('torchvision')
+
+import inference
+from model import TrashDetectionModel
+
+
+def _checkpoint(path, **save_options):
+    model = TrashDetectionModel(num_trash_classes=3, pretrained=False, backbone='resnet18')
+    torch.save(model.state_dict(), path, **save_options)
+    return model
+
+
+def test_load_model_restores_checkpoint_weights(tmp_path):
+    path = str(tmp_path / 'model.pth')
+    saved = _checkpoint(path)
+    loaded = inference.load_model(path, num_trash_classes=3, backbone='resnet18')
+    assert not loaded.training
+    for name, value in saved.state_dict().items():
+        assert torch.equal(loaded.state_dict()[name], value)
+
+
+def test_load_model_falls_back_for_legacy_checkpoints(tmp_path):
+    path = str(tmp_path / 'legacy.pth')
+    saved = _checkpoint(path, _use_new_zipfile_serialization=False) # Cannot be memory-mapped
+    loaded = inference.load_model(path, num_trash_classes=3, backbone='resnet18')
+    for name, value in saved.state_dict().items():
+        assert torch.equal(loaded.state_dict()[name], value)
+
+
+def test_startup_timings_describe_the_latest_load_only(tmp_path):
+    path = str(tmp_path / 'model.pth')
+    _checkpoint(path)
+    timings = inference.startup_timings
+    timings.update({'load_checkpoint_s': 1e6, 'stale_step_s': 1e6}) # As if left by an earlier load
+    inference.load_model(path, num_trash_classes=3, backbone='resnet18')
+    assert inference.startup_timings is timings
+    assert 'stale_step_s' not in timings
+    assert 0 < timings['load_checkpoint_s'] < 1e6
+
+
+def test_category_names_are_read_once_per_process(tmp_path):
+    categories = tmp_path / 'categories.json'
+    categories.write_text('{"0": "Bottle"}')
+    assert inference.get_category_names(2, str(categories)) == ['Bottle', 'class_1']
+    categories.write_text('{"0": "Can"}')
+    assert inference.get_category_names(2, str(categories)) == ['Bottle', 'class_1']
+
+
+def test_mismatched_checkpoint_raises_without_fallback(tmp_path, monkeypatch):
+    import model as model_module
+    path = str(tmp_path / 'model.pth')
+    _checkpoint(path)
+    constructed = []
+
+    class CountingModel(TrashDetectionModel):
+        def __init__(self, *args, **kwargs):
+            constructed.append(kwargs)
+            super().__init__(*args, **kwargs)
+    monkeypatch.setattr(model_module, 'TrashDetectionModel', CountingModel)
+
+    with pytest.raises(RuntimeError):
+        inference.load_model(path, num_trash_classes=4, backbone='resnet18')
+    assert len(constructed) == 1
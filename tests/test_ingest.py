@@ -0,0 +1,153 @@
+import os
+import time
+import asyncio
+
+import pytest
+from aiohttp.test_utils import TestClient, TestServer
+
+import ingest
+
+
+@pytest.fixture(autouse=True)
+def storage(tmp_path, monkeypatch):
+    monkeypatch.setattr(ingest, 'STORAGE_DIR', str(tmp_path))
+    monkeypatch.setattr(ingest, 'uploads', {})
+    return tmp_path
+
+
+def _run(scenario):
+    async def main():
+        async with TestClient(TestServer(ingest.create_app())) as client:
+            return await scenario(client)
+    return asyncio.run(main())
+
+
+async def _upload(client, body, filename='clip.mp4'):
+    response = await client.post('/uploads', headers={'X-Filename': filename, 'Upload-Length': str(len(body))})
+    upload_id = (await response.json())['upload_id']
+    analysis = ingest.uploads[upload_id].analysis
+    response = await client.patch(f'/uploads/{upload_id}', data=body, headers={'Upload-Offset': '0'})
+    assert response.status == 204
+    await analysis
+    return upload_id
+
+
+@pytest.mark.parametrize('length', ['abc', '-1', '1.5'])
+def test_invalid_upload_length_is_rejected(length):
+    async def scenario(client):
+        response = await client.post('/uploads', headers={'X-Filename': 'clip.mp4', 'Upload-Length': length})
+        return response.status
+    assert _run(scenario) == 400
+    assert ingest.uploads == {}
+
+
+def test_completed_upload_is_released_and_served_from_meta(monkeypatch):
+    monkeypatch.setattr(ingest, '_read_new_frames', lambda path, start, complete: ([(0, 'frame')] if complete else [], 1))
+    monkeypatch.setattr(ingest, '_predict_frame', lambda frame: [{'trash_class': 3}])
+
+    async def scenario(client):
+        upload_id = await _upload(client, b'footage')
+        assert upload_id not in ingest.uploads
+        head = await client.head(f'/uploads/{upload_id}')
+        status = await (await client.get(f'/uploads/{upload_id}')).json()
+        return head.headers['Upload-Offset'], status
+    offset, status = _run(scenario)
+    assert offset == '7'
+    assert status['complete'] and status['error'] is None
+    assert status['detections'] == [{'frame': 0, 'detections': [{'trash_class': 3}]}]
+    assert ingest.uploads == {}
+
+
+def test_analysis_failure_is_reported(monkeypatch):
+    def broken(path, start, complete):
+        raise ValueError('cannot decode')
+    monkeypatch.setattr(ingest, '_read_new_frames', broken)
+
+    async def scenario(client):
+        upload_id = await _upload(client, b'footage')
+        return await (await client.get(f'/uploads/{upload_id}')).json()
+    status = _run(scenario)
+    assert status['complete']
+    assert status['error'] == 'ValueError: cannot decode'
+    assert ingest.uploads == {}
+
+
+def test_early_upload_complete_is_rejected_when_length_was_declared(monkeypatch):
+    monkeypatch.setattr(ingest, '_read_new_frames', lambda path, start, complete: ([], start))
+
+    async def scenario(client):
+        response = await client.post('/uploads', headers={'X-Filename': 'clip.mp4', 'Upload-Length': '10'})
+        upload_id = (await response.json())['upload_id']
+        response = await client.patch(f'/uploads/{upload_id}', data=b'abc',
+                                      headers={'Upload-Offset': '0', 'Upload-Complete': '1'})
+        status = await (await client.get(f'/uploads/{upload_id}')).json()
+        return response.status, response.headers['Upload-Offset'], status
+    status_code, offset, status = _run(scenario)
+    assert (status_code, offset) == (400, '3')
+    assert (status['complete'], status['offset']) == (False, 3)
+
+
+def test_restored_upload_reports_stored_size(monkeypatch):
+    monkeypatch.setattr(ingest, '_read_new_frames', lambda path, start, complete: ([], start))
+
+    async def scenario(client):
+        response = await client.post('/uploads', headers={'X-Filename': 'clip.mp4'})
+        upload_id = (await response.json())['upload_id']
+        analysis = ingest.uploads[upload_id].analysis
+        await client.patch(f'/uploads/{upload_id}', data=b'abc', headers={'Upload-Offset': '0', 'Upload-Complete': '1'})
+        await analysis
+        return await (await client.get(f'/uploads/{upload_id}')).json()
+    status = _run(scenario)
+    assert (status['complete'], status['offset'], status['length']) == (True, 3, None)
+
+
+def _write_upload(storage, upload_id, complete=False, age=0):
+    upload = ingest.Upload(upload_id, 'clip.mp4', complete=complete)
+    upload.save_meta()
+    if not complete:
+        with open(upload.data_path, 'wb') as f:
+            f.write(b'abc')
+    for path in (upload.meta_path, upload.data_path):
+        if os.path.exists(path):
+            os.utime(path, (time.time() - age, time.time() - age))
+    return upload
+
+
+def test_abandoned_uploads_expire_in_memory_and_on_disk(storage, monkeypatch):
+    monkeypatch.setattr(ingest, '_read_new_frames', lambda path, start, complete: ([], start))
+    old = ingest.UPLOAD_EXPIRY + 60
+    on_disk = _write_upload(storage, 'a' * 32, age=old)
+    finished = _write_upload(storage, 'b' * 32, complete=True, age=old)
+
+    async def scenario(client):
+        response = await client.post('/uploads', headers={'X-Filename': 'clip.mp4'})
+        upload_id = (await response.json())['upload_id']
+        await client.patch(f'/uploads/{upload_id}', data=b'abc', headers={'Upload-Offset': '0'})
+        analysis = ingest.uploads[upload_id].analysis
+        expired = ingest.expire_uploads(now=time.time() + old)
+        await asyncio.sleep(0)
+        return upload_id, expired, analysis.cancelled()
+    upload_id, expired, cancelled = _run(scenario)
+
+    assert sorted(expired) == sorted([upload_id, on_disk.upload_id])
+    assert cancelled
+    assert ingest.uploads == {}
+    assert sorted(os.listdir(storage)) == [f'{finished.upload_id}.json']
+
+
+def test_recent_uploads_do_not_expire(storage):
+    _write_upload(storage, 'a' * 32)
+    assert ingest.expire_uploads() == []
+    assert len(os.listdir(storage)) == 2
+
+
+def test_concurrent_restores_share_one_upload(storage, monkeypatch):
+    monkeypatch.setattr(ingest, '_read_new_frames', lambda path, start, complete: ([], start))
+    _write_upload(storage, 'a' * 32)
+
+    async def scenario():
+        first, second = await asyncio.gather(ingest.get_upload('a' * 32), ingest.get_upload('a' * 32))
+        same = first is second and ingest.uploads['a' * 32] is first
+        first.analysis.cancel()
+        return same, first.offset
+    assert asyncio.run(scenario()) == (True, 3)
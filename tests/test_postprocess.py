@@ -0,0 +1,63 @@
+import json
+
+import pytest
+
+torch = pytest.importorskip('torch')
+pytest.importorskip('torchvision')
+
+from postprocess import load_category_names, postprocess
+
+
+def _outputs(boxes, person_probs, trash_probs):
+    count = len(boxes)
+    return (
+        torch.tensor(boxes, dtype=torch.float),
+        torch.log(torch.tensor(person_probs)),
+        torch.zeros(count, 4),
+        torch.log(torch.tensor(trash_probs)),
+        torch.log(torch.tensor([[0.2, 0.8]] * count)),
+    )
+
+
+def test_load_category_names_falls_back_for_unknown_ids(tmp_path):
+    categories = tmp_path / 'categories.json'
+    categories.write_text(json.dumps({'1': 'Bottle', '99': 'Out of range'}))
+    assert load_category_names(str(categories), num_classes=3) == ['class_0', 'Bottle', 'class_2']
+    assert load_category_names(str(tmp_path / 'missing.json'), num_classes=2) == ['class_0', 'class_1']
+
+
+def test_postprocess_applies_per_class_thresholds():
+    outputs = _outputs(
+        [[0, 0, 10, 10], [20, 20, 30, 30], [40, 40, 50, 50]],
+        [[0.1, 0.9], [0.9, 0.1], [0.8, 0.2]],
+        [[0.8, 0.1, 0.1], [0.1, 0.6, 0.3], [0.1, 0.1, 0.8]],
+    )
+    results = postprocess(outputs, class_names=['a', 'b', 'c'], trash_thresholds={1: 0.7})
+    assert len(results) == 1
+    assert [(r['bbox'], r['trash_class'], r['trash_name']) for r in results[0]] == [
+        ([0.0, 0.0, 10.0, 10.0], 0, 'a'),
+        ([40.0, 40.0, 50.0, 50.0], 2, 'c'),
+    ]
+    assert results[0][0]['disposal_class'] == 1
+    assert results[0][0]['person_score'] == pytest.approx(0.9)
+
+
+def test_postprocess_keeps_person_when_trash_is_below_threshold():
+    outputs = _outputs([[0, 0, 10, 10]], [[0.1, 0.9]], [[0.8, 0.1, 0.1]])
+    [[record]] = postprocess(outputs, trash_thresholds=0.9)
+    assert (record['trash_class'], record['trash_name']) == (None, None)
+    assert record['trash_score'] == pytest.approx(0.8)
+
+
+def test_postprocess_suppresses_overlaps_within_a_frame_only():
+    outputs = _outputs(
+        [[0, 0, 10, 10], [1, 1, 10, 10]],
+        [[0.1, 0.9], [0.3, 0.7]],
+        [[0.4, 0.3, 0.3], [0.4, 0.3, 0.3]],
+    )
+    [frame] = postprocess(outputs)
+    assert [r['bbox'] for r in frame] == [[0.0, 0.0, 10.0, 10.0]]
+
+    first, second = postprocess(outputs, image_ids=torch.tensor([0, 1]))
+    assert [r['bbox'] for r in first] == [[0.0, 0.0, 10.0, 10.0]]
+    assert [r['bbox'] for r in second] == [[1.0, 1.0, 10.0, 10.0]]
@@ -0,0 +1,44 @@
+import pytest
+
+torch = pytest.importorskip('torch')
+pytest.importorskip('torchvision')
+
+from preprocess import INPUT_SIZE, tile_region, plan_regions, batch_patches, to_frame_coordinates
+
+
+def test_tile_region_covers_region_with_overlap():
+    tiles = tile_region([0, 0, 100, 60], tile_size=50, overlap=0.25)
+    assert tiles == [
+        [0, 0, 50, 50], [37, 0, 87, 50], [50, 0, 100, 50],
+        [0, 10, 50, 60], [37, 10, 87, 60], [50, 10, 100, 60],
+    ]
+
+
+def test_tile_region_smaller_than_tile_is_one_patch():
+    assert tile_region([10, 10, 40, 30], tile_size=50) == [[10, 10, 40, 30]]
+
+
+def test_plan_regions_defaults_to_whole_frame():
+    assert plan_regions((100, 80)) == [[0, 0, 100, 80]]
+
+
+def test_plan_regions_clips_rois_and_drops_empty_ones():
+    rois = [[-10, -10, 50, 50], [90, 70, 200, 200], [120, 0, 150, 10]]
+    assert plan_regions((100, 80), rois) == [[0, 0, 50, 50], [90, 70, 100, 80]]
+
+
+def test_plan_regions_tiles_each_roi():
+    regions = plan_regions((1920, 1080), [[0, 0, 100, 60]], tile_size=50)
+    assert regions == tile_region([0, 0, 100, 60], 50)
+
+
+def test_batch_patches_stacks_model_sized_patches():
+    from PIL import Image
+    batch = batch_patches(Image.new('RGB', (200, 100)), [[0, 0, 100, 100], [100, 0, 200, 50]])
+    assert batch.shape == (2, 3, INPUT_SIZE, INPUT_SIZE)
+
+
+def test_to_frame_coordinates_maps_patch_boxes_into_frame():
+    boxes = torch.tensor([[0.0, 0.0, 1.0, 1.0], [0.5, 0.5, 1.0, 1.0]])
+    frame_boxes = to_frame_coordinates(boxes, [[10, 20, 110, 220], [0, 0, 50, 50]])
+    assert frame_boxes.tolist() == [[10.0, 20.0, 110.0, 220.0], [25.0, 25.0, 50.0, 50.0]]
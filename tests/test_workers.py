@@ -0,0 +1,145 @@
+import time
+import threading
+import types
+
+import workers
+from workers import plan_assignments, plan_moves, WorkerSupervisor
+
+
+def _camera(location, sample_fps=2.0):
+    return {'location': location, 'sample_fps': sample_fps}
+
+
+def _stats(seconds_per_frame, cameras):
+    return {'seconds_per_frame': seconds_per_frame, 'cameras': {
+        location: {'sampled_fps': sampled, 'inferred_fps': inferred} for location, (sampled, inferred) in cameras.items()
+    }}
+
+
+def test_plan_assignments_balances_load_largest_first():
+    cameras = [_camera('a', 4.0), _camera('b', 3.0), _camera('c', 2.0), _camera('d', 1.0)]
+    assignments = plan_assignments(cameras, [0, 1])
+    assert assignments == {'a': 0, 'b': 1, 'c': 1, 'd': 0}
+
+
+def test_plan_moves_needs_measurements():
+    cameras = {'a': _camera('a')}
+    assert plan_moves({'a': 0}, cameras, {}) == []
+
+
+def test_plan_moves_takes_load_off_lagging_worker():
+    cameras = {location: _camera(location) for location in 'abc'}
+    assignments = {'a': 0, 'b': 0, 'c': 1}
+    worker_stats = {
+        # Worker 0 manages ~3 inferences/s but is asked for 4, so its cameras lag
+        0: _stats(0.3, {'a': (1.0, 1.0), 'b': (1.0, 1.0)}),
+        1: _stats(0.1, {'c': (2.0, 2.0)}),
+    }
+    assert plan_moves(assignments, cameras, worker_stats) == [('a', 0, 1)]
+
+
+def test_plan_moves_keeps_cameras_when_no_worker_has_room():
+    cameras = {location: _camera(location) for location in 'ab'}
+    worker_stats = {
+        0: _stats(1.0, {'a': (1.0, 1.0)}),
+        1: _stats(1.0, {'b': (1.0, 1.0)}),
+    }
+    assert plan_moves({'a': 0, 'b': 1}, cameras, worker_stats) == []
+
+
+def test_plan_moves_ignores_disconnected_streams():
+    cameras = {location: _camera(location) for location in 'ab'}
+    worker_stats = {0: _stats(0.1, {'a': (0.0, 0.0)}), 1: _stats(0.1, {'b': (2.0, 2.0)})}
+    worker_stats[0]['cameras']['a']['connected'] = False
+    assert plan_moves({'a': 0, 'b': 1}, cameras, worker_stats) == []
+
+
+class _DeadProcess:
+    exitcode = 1
+
+    def is_alive(self):
+        return False
+
+
+class _LiveProcess:
+    def is_alive(self):
+        return True
+
+
+def test_check_workers_restarts_dead_worker_and_reassigns_its_cameras(monkeypatch):
+    supervisor = WorkerSupervisor([_camera('a'), _camera('b'), _camera('c')], num_workers=2)
+    supervisor.assignments = {'a': 0, 'b': 1, 'c': 1}
+    supervisor.worker_stats = {0: {}, 1: {}}
+    supervisor.processes = [_LiveProcess(), _DeadProcess()]
+    started, assigned = [], []
+    monkeypatch.setattr(supervisor, '_start_worker', started.append)
+    monkeypatch.setattr(supervisor, '_assign', lambda location, worker_id: assigned.append((location, worker_id)))
+
+    assert supervisor.check_workers() == [1]
+    assert started == [1]
+    assert sorted(assigned) == [('b', 1), ('c', 1)]
+    assert 1 not in supervisor.worker_stats
+
+
+class _LiveCapture:
+    """
+    Stands in for cv2.VideoCapture on a live stream: every grab() returns the
+    next frame number, as a camera producing frames faster than they are used.
+    """
+    def __init__(self, stream_url):
+        self.grabbed = 0
+
+    def isOpened(self):
+        return True
+
+    def grab(self):
+        time.sleep(0.001)
+        self.grabbed += 1
+        return True
+
+    def retrieve(self):
+        return True, self.grabbed
+
+    def release(self):
+        pass
+
+
+def _wait_for(predicate, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        value = predicate()
+        if value:
+            return value
+        time.sleep(0.005)
+    return None
+
+
+def test_stream_reader_returns_newest_frame_on_request():
+    reader = workers._StreamReader('rtsp://camera', types.SimpleNamespace(VideoCapture=_LiveCapture))
+    try:
+        assert _wait_for(lambda: reader.connected)
+        assert reader.take() is None # Nothing is decoded until a frame is requested
+        reader.request()
+        first = _wait_for(reader.take)
+        time.sleep(0.1) # The stream keeps running between samples
+        reader.request()
+        second = _wait_for(reader.take)
+        assert second - first >= 20 # Not the next buffered frame but the current one
+    finally:
+        reader.stop()
+
+
+def test_stream_reader_does_not_block_on_stalled_open():
+    opened = threading.Event()
+
+    class StalledCapture(_LiveCapture):
+        def __init__(self, stream_url):
+            opened.wait(5)
+            super().__init__(stream_url)
+
+    started = time.monotonic()
+    reader = workers._StreamReader('rtsp://stalled', types.SimpleNamespace(VideoCapture=StalledCapture))
+    assert time.monotonic() - started < 0.5
+    assert not reader.connected
+    reader.stop()
+    opened.set()